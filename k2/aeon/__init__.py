@@ -4,7 +4,9 @@ from .aeon import Aeon
 from .exceptions import AeonResponse
 from .responses import (
     Response,
+    FileResponse,
     StaticResponse,
+    StreamResponse,
 )
 from .sitemodules import (
     Rederict,
@@ -19,11 +21,13 @@ __all__ = [
     'Aeon',
     'Rederict',
     'Response',
+    'FileResponse',
     'WSHandler',
     'SiteModule',
     'ScriptRunner',
     'AeonResponse',
     'ClientSession',
     'StaticResponse',
+    'StreamResponse',
     'StaticSiteModule',
 ]
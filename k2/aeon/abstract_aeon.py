@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 import sys
 import ssl
+import signal
 import asyncio
 import socket
+from typing import Awaitable, Dict, Iterable, List, Optional, Tuple
 
 import k2.logger as logger
+import k2.stats.stats as stats
+from k2.aeon.supervisor import Supervisor
 from k2.utils.autocfg import AutoCFG
 
 ABSTRACT_AEON_DEFAULTS = {
@@ -25,6 +29,14 @@ ABSTRACT_AEON_DEFAULTS = {
     'start_serving': True,
     'site_dir': './var/',
     'logger': {},
+    'keep_alive_timeout': 75.0,  # seconds to wait for next request on keep-alive connection; None for no limit
+    'max_keep_alive_requests': 1000,  # requests per connection; None for no limit
+    # open connections per process; when reached, new ones wait in listen backlog
+    # (ones accepted at once with the last allowed one are closed with reject_connection())
+    'max_connections': None,
+    'shutdown_timeout': 10.0,  # seconds for in-flight requests to finish on shutdown
+    'workers': 1,  # count of processes; if > 1, workers are forked and share listening sockets
+    'supervisor': {},  # kwargs for k2.aeon.supervisor.Supervisor
 }
 
 
@@ -57,13 +69,30 @@ class AbstractAeon:
             )
             self.cfg.ssl.set_servername_callback(self.servername_callback)
         self._task = None
-        self._server = None
+        self._servers = []
+        self._closing = False
+        self._stop_event = None
+        self._accept_paused = False
+        # listening sockets (and their ssl contexts) of servers closed while accepting is paused
+        self._paused_sockets = []  # type: List[Tuple[socket.socket, Optional[ssl.SSLContext]]]
+        # connection handler task => [writer, True if connection is idle]
+        self._connections = {}  # type: Dict[asyncio.Task, list]
         self._logger = logger.new_channel(
             key='aeon',
             parent=logger.get_channel('base_logger'),
             **self.cfg.logger,
         )
         self.running_tasks = []
+        stats.new(
+            key='accept_pauses',
+            type='time_event_counter',
+            description='times accepting was paused because of max_connections',
+        )
+        stats.new(
+            key='rejected_connections',
+            type='time_event_counter',
+            description='connections closed because of max_connections',
+        )
 
     def servername_callback(self, sock, req_hostname, cb_context, as_callback=True):
         """
@@ -74,6 +103,175 @@ class AbstractAeon:
         if context:
             sock.context = context
 
+    @property
+    def closing(self) -> bool:
+        """
+            True if server is shutting down: no new requests must be read
+        """
+        return self._closing
+
+    def _pause_accepting(self) -> None:
+        """
+            close servers but keep their listening sockets open: new connections wait in backlog
+        """
+        self._accept_paused = True
+        for server in self._servers:
+            for sock in server.sockets:
+                port = sock.getsockname()[1]
+                self._paused_sockets.append(
+                    (sock.dup(), self.cfg.ssl if self.cfg.use_ssl and port == self.cfg.https_port else None),
+                )
+            server.close()
+        self._servers = []
+        stats.add_nowait('accept_pauses')
+
+    async def _resume_accepting(self) -> None:
+        """
+            start servers on listening sockets again
+        """
+        self._accept_paused = False
+        sockets, self._paused_sockets = self._paused_sockets, []
+        if not self._closing:
+            servers = await asyncio.gather(
+                *[
+                    asyncio.start_server(
+                        self._handle_connection,
+                        sock=sock,
+                        ssl=context,
+                        ssl_handshake_timeout=self.cfg.ssl_handshake_timeout if context else None,
+                    )
+                    for sock, context in sockets
+                ]
+            )
+            if not self._closing:
+                self._servers.extend(servers)
+                if self._accept_paused:
+                    # limit was reached again while servers were starting
+                    self._pause_accepting()
+                return
+            for server in servers:
+                server.close()
+        for sock, _ in sockets:
+            sock.close()
+
+    async def reject_connection(self, reader, writer):
+        """
+            called for connection accepted over max_connections; it's closed after
+            U can overwrite it to answer client with your own protocol
+        """
+
+    async def _handle_connection(self, reader, writer):
+        """
+            track connection to drain it on shutdown
+            and pause accepting while there are max_connections of them
+        """
+        limit = self.cfg.max_connections
+        if limit is not None and len(self._connections) >= limit:
+            # accepted in same batch before accepting was paused
+            await stats.add('rejected_connections')
+            try:
+                await self.reject_connection(reader, writer)
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+            return
+        self._connections[task := asyncio.current_task()] = [writer, False]
+        if limit is not None and len(self._connections) >= limit and not self._accept_paused:
+            self._pause_accepting()
+        try:
+            await self.client_connected_cb(reader, writer)
+        except asyncio.CancelledError:
+            # aborted on shutdown
+            if not self._closing:
+                raise
+        finally:
+            self._connections.pop(task, None)
+            if self._accept_paused and len(self._connections) < limit:
+                await self._resume_accepting()
+
+    def set_idle(self, idle: bool = True) -> None:
+        """
+            mark current connection as idle (waiting for next request) or busy
+            must be called from client_connected_cb
+            idle connections are closed immediately on shutdown
+        """
+        if (conn := self._connections.get(asyncio.current_task())) is not None:
+            conn[1] = idle
+            if idle and self._closing:
+                conn[0].close()
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        """
+            stop accepting connections, close idle ones
+            and wait for in-flight requests to finish
+            timeout - max time to wait (default: cfg.shutdown_timeout); then connections are aborted
+        """
+        self._closing = True
+        for server in self._servers:
+            server.close()
+        for sock, _ in self._paused_sockets:
+            sock.close()
+        self._paused_sockets = []
+        for writer, idle in list(self._connections.values()):
+            if idle:
+                writer.close()
+        if self._connections:
+            await self._logger.info('waiting for {} connection(s)', len(self._connections))
+        # some of them could be closed while logging
+        if self._connections:
+            _, pending = await asyncio.wait(
+                list(self._connections),
+                timeout=self.cfg.shutdown_timeout if timeout is None else timeout,
+            )
+            for task in pending:
+                self._connections[task][0].transport.abort()
+                task.cancel()
+            if pending:
+                await self._logger.warning('aborted {} connection(s)', len(pending))
+                await asyncio.wait(pending)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+
+    def stop(self) -> None:
+        """
+            ask running server to shut down gracefully
+        """
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    def _serve(
+        self,
+        servers: Awaitable,
+        tasks: Iterable[Awaitable] = (),
+        signals: Iterable[int] = (signal.SIGTERM, signal.SIGINT),
+    ) -> None:
+        """
+            start servers and run event loop until stop() or one of signals
+            then shut down gracefully
+        """
+        loop = self.cfg.loop
+        self._stop_event = asyncio.Event()
+        for signum in signals:
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # not supported (Windows) or not main thread; KeyboardInterrupt is still handled
+                pass
+        try:
+            self._servers = list(loop.run_until_complete(servers))
+            self.running_tasks.extend(asyncio.ensure_future(task) for task in tasks)
+            loop.run_until_complete(self._stop_event.wait())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            loop.run_until_complete(self.shutdown())
+            for task in self.running_tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*self.running_tasks, return_exceptions=True))
+            logger.flush()
+
     async def client_connected_cb(self, reader, writer):
         try:
             while data := await reader.read(100):
@@ -92,10 +290,9 @@ class AbstractAeon:
         if self._task is None:
             tasks = []
             http_args = {
-                'client_connected_cb': self.client_connected_cb,
+                'client_connected_cb': self._handle_connection,
                 'host': self.cfg.host,
                 'port': self.cfg.port,
-                'loop': self.cfg.loop,
                 'family': self.cfg.family,
                 'flags': self.cfg.flags,
                 'backlog': self.cfg.backlog,
@@ -114,10 +311,9 @@ class AbstractAeon:
 
             if self.cfg.use_ssl:
                 https_args = {
-                    'client_connected_cb': self.client_connected_cb,
+                    'client_connected_cb': self._handle_connection,
                     'host': self.cfg.host,
                     'port': self.cfg.https_port,
-                    'loop': self.cfg.loop,
                     'family': self.cfg.family,
                     'flags': self.cfg.flags,
                     'backlog': self.cfg.backlog,
@@ -136,34 +332,69 @@ class AbstractAeon:
             self._task = tasks
         return self._task
 
-    def run(self):
-        ports = f'{self.cfg.port}, {self.cfg.https_port}' if self.cfg.use_ssl else self.cfg.port
+    def listen(self) -> List[Tuple[socket.socket, Optional[ssl.SSLContext]]]:
+        """
+            create listening sockets for http (and https) port
+            return list of (socket, ssl context or None)
+        """
+        sockets = []
+        for port, context in [(self.cfg.port, None)] + ([(self.cfg.https_port, self.cfg.ssl)] if self.cfg.use_ssl else []):
+            for family, _type, proto, _, addr in socket.getaddrinfo(
+                self.cfg.host or None,
+                port,
+                family=self.cfg.family,
+                type=socket.SOCK_STREAM,
+                flags=self.cfg.flags,
+            ):
+                sock = socket.socket(family, _type, proto)
+                if self.cfg.reuse_address is not False:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                if self.cfg.reuse_port:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                if family == socket.AF_INET6:
+                    sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+                sock.bind(addr)
+                sock.listen(self.cfg.backlog)
+                sock.setblocking(False)
+                sockets.append((sock, context))
+        return sockets
+
+    def run_worker(
+        self,
+        sockets: List[Tuple[socket.socket, Optional[ssl.SSLContext]]],
+        tasks: Iterable[Awaitable] = (),
+    ) -> None:
+        """
+            serve already listening sockets in new event loop until SIGTERM
+            used in forked worker process; SIGINT is left to supervisor
+            tasks - extra coroutines to run along with server
+        """
+        asyncio.set_event_loop(loop := asyncio.new_event_loop())
+        self.cfg.loop = loop
         self.running_tasks = []
-        try:
-            self.running_tasks = [
-                asyncio.ensure_future(
-                    self._logger.info(
-                        'server started on {}',
-                        ports,
+        self._serve(
+            asyncio.gather(
+                *[
+                    asyncio.start_server(
+                        self._handle_connection,
+                        sock=sock,
+                        ssl=context,
+                        ssl_handshake_timeout=self.cfg.ssl_handshake_timeout if context else None,
                     )
-                )
-            ]
+                    for sock, context in sockets
+                ]
+            ),
+            tasks=tasks,
+            signals=(signal.SIGTERM,),
+        )
 
-            self.running_tasks.extend(
-                asyncio.ensure_future(task)
-                for task in self.tasks
-            )
-            self.cfg.loop.run_forever()
-        except KeyboardInterrupt:
-            pass
-        finally:
-            for task in self.running_tasks:
-                task.cancel()
-            self.cfg.loop.run_until_complete(
-                asyncio.ensure_future(
-                    self._logger.info(
-                        'server stopped on {}',
-                        ports,
-                    )
-                )
-            )
+    def run(self):
+        if self.cfg.workers > 1:
+            return Supervisor(self, **self.cfg.supervisor).run()
+        ports = f'{self.cfg.port}, {self.cfg.https_port}' if self.cfg.use_ssl else self.cfg.port
+        self.running_tasks = []
+        self._serve(
+            asyncio.gather(*self.tasks),
+            tasks=[self._logger.info('server started on {}', ports)],
+        )
+        self.cfg.loop.run_until_complete(self._logger.info('server stopped on {}', ports))
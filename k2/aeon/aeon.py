@@ -6,6 +6,7 @@ from typing import (
     Dict,
     List,
     Optional,
+    Tuple,
     Type,
 )
 
@@ -16,14 +17,25 @@ from k2.aeon.exceptions import AeonResponse
 from k2.aeon.sitemodules.base import BaseSiteModule
 from k2.aeon.ws.base import BaseWSHandler
 from k2.aeon.namespace import NameSpace
+from k2.aeon.ware import WareChain, WareList, compile_ware, select_wares
 from k2.utils.autocfg import AutoCFG
 from k2.utils.http import (
     NOT_FOUND,
     SMTH_HAPPENED,
+    SERVICE_UNAVAILABLE,
     run_ware,
 )
 import k2.stats.stats as stats
 
+AEON_DEFAULTS = {
+    'max_in_flight': None,  # requests handled at once; others wait for free slot; None for no limit
+    'max_queued': None,  # requests waiting for free slot; others get 503; None for no limit
+    'queue_timeout': 10.0,  # seconds to wait for free slot; then 503; None for no limit
+    'linger_timeout': 1.0,  # seconds to read rest of request of connection rejected by max_connections
+    'pipeline_depth': 1,  # pipelined requests of connection handled at once; 1 - one by one
+    'ware_stats': True,  # if True, time of each middleware / postware call is kept in stat "ware-<name>"
+}
+
 
 class Aeon(AbstractAeon):
     """
@@ -31,12 +43,24 @@ class Aeon(AbstractAeon):
     """
 
     # objects must be callable or asyncio.corutines
+    # copied to each server; add new ones with add_middleware() / add_postware()
+    # (or change server's lists in any way: compiled chains are rebuilt)
     middleware = []  # type: List[Callable]
     postware = []  # type: List[Callable]
 
     def __init__(self, /, **b):
         super().__init__(**b)
+        self.cfg.update_missing({k: b.get(k, v) for k, v in AEON_DEFAULTS.items()})
+        self._in_flight = None  # type: Optional[asyncio.Semaphore]
+        self._queued = 0
+        # id(ware) => (ware, compiled ware)
+        self._compiled = {}  # type: Dict[int, Tuple[Callable, Callable]]
+        # id(route) => (route, middleware chain, postware chain)
+        self._chains = {}  # type: Dict[int, Tuple[object, WareChain, WareChain]]
+        self.middleware = WareList(self.middleware, self._chains.clear)
+        self.postware = WareList(self.postware, self._chains.clear)
         self._request_prop = b.get('request', {})
+        self._request_cfg = Request.make_cfg(**self._request_prop)
         self._ws_prop = b.get('websocket', {})
         self.namespace = NameSpace(
             tree=b.get('namespace'),
@@ -46,10 +70,64 @@ class Aeon(AbstractAeon):
         stats.new(key='request_log', type='time_events', description='log for each request')
         stats.new(key='ws_connections', type='counter', description='opened ws conenctions')
         stats.new(key='connections', type='counter', description='opened conenctions')
+        stats.new(key='queued_requests', type='counter', description='requests waiting for free slot')
+        stats.new(key='rejected_requests', type='time_event_counter', description='requests answered with 503')
+
+    async def _acquire_slot(self) -> bool:
+        """
+            wait for free slot if there are max_in_flight requests being handled
+            return False if request must be rejected
+        """
+        if self.cfg.max_in_flight is None:
+            return True
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.cfg.max_in_flight)
+        if not self._in_flight.locked():
+            await self._in_flight.acquire()
+            return True
+        if self.cfg.max_queued is not None and self._queued >= self.cfg.max_queued:
+            return False
+        self._queued += 1
+        await stats.add('queued_requests', 1)
+        try:
+            await asyncio.wait_for(self._in_flight.acquire(), self.cfg.queue_timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._queued -= 1
+            await stats.add('queued_requests', -1)
+        return True
+
+    def _release_slot(self) -> None:
+        if self._in_flight is not None:
+            self._in_flight.release()
+
+    def _compile(self, ware: Callable) -> Callable:
+        if (compiled := self._compiled.get(id(ware))) is None:
+            compiled = self._compiled[id(ware)] = (ware, compile_ware(ware, timing=self.cfg.ware_stats))
+        return compiled[1]
+
+    def _route_wares(self, route) -> Tuple[WareChain, WareChain]:
+        """
+            middleware and postware for route compiled on first request to it
+        """
+        if not (isinstance(self.middleware, WareList) and isinstance(self.postware, WareList)):
+            # lists were replaced: track changes of new ones
+            self.middleware = WareList(self.middleware, self._chains.clear)
+            self.postware = WareList(self.postware, self._chains.clear)
+            self._chains.clear()
+        if (chains := self._chains.get(id(route))) is None:
+            chains = self._chains[id(route)] = (
+                route,
+                WareChain(self._compile(ware) for ware in select_wares(self.middleware, route, 'middleware')),
+                WareChain(self._compile(ware) for ware in select_wares(self.postware, route, 'postware')),
+            )
+        return chains[1], chains[2]
 
     async def _handle_request(self, request: Request, _run_ware: bool = True):
         try:
             module, args = self.namespace.find_best(request.url)
+            middleware, postware = self._route_wares(module)
             if not module:
                 resp = Response(data=NOT_FOUND, code=404)
             else:
@@ -66,9 +144,8 @@ class Aeon(AbstractAeon):
 
                 elif isinstance(module, BaseSiteModule):
                     await request.logger.debug('found module: {}', module)
-                    if _run_ware:
-                        for ware in self.middleware:
-                            await run_ware(ware, module=module, request=request, args=args)
+                    if _run_ware and middleware:
+                        await middleware(module=module, request=request, args=args)
                     resp = await module.handle(request=request, **args)
 
                 elif isinstance(module, Response):
@@ -91,51 +168,196 @@ class Aeon(AbstractAeon):
         if resp and _run_ware:
             for ware in request.postware:
                 await run_ware(ware, module=module, request=request, args=args, response=resp)
-            for ware in self.postware:
-                await run_ware(ware, module=module, request=request, args=args, response=resp)
+            if postware:
+                await postware(module=module, request=request, args=args, response=resp)
 
         return resp
 
+    async def _process(self, request: Request) -> Optional[Response]:
+        """
+            handle request read from socket if there is free in-flight slot
+        """
+        await stats.add(key='request_log', value=f'{request.method} {request.target}')
+        if await self._acquire_slot():
+            try:
+                return await self._handle_request(request)
+            finally:
+                self._release_slot()
+        # shed load quickly instead of slowing down everyone
+        await stats.add('rejected_requests')
+        return AeonResponse(
+            data=SERVICE_UNAVAILABLE,
+            code=503,
+            headers={'Retry-After': '1'},
+            close_conn=True,
+        ).response
+
+    def _is_last(self, served: int) -> bool:
+        """
+            True if no more requests must be read from connection
+        """
+        return self.closing or (
+            self.cfg.max_keep_alive_requests is not None and served >= self.cfg.max_keep_alive_requests
+        )
+
+    @staticmethod
+    def _keep_alive(request: Request, resp: Optional[Response]) -> bool:
+        return 'close' not in {
+            request.headers.get('connection', 'keep-alive'),
+            resp.headers.get('connection', 'keep-alive') if resp else 'close',
+        } and request.keep_alive and not request.data_pending
+
+    async def _read_ahead(
+        self,
+        queue: asyncio.Queue,
+        slots: asyncio.Semaphore,
+        new_request: Callable[[], Request],
+    ) -> None:
+        """
+            read pipelined requests and start handling them concurrently
+            put (request, future of response, True if it's last one) into queue in order of reading
+            None is put after last request
+            slot is taken before reading each request and freed when its response is sent
+        """
+        served = 0
+        try:
+            while True:
+                await slots.acquire()
+                request = new_request()
+                try:
+                    await request.read(idle_timeout=self.cfg.keep_alive_timeout if served else None)
+                except RuntimeError:
+                    break
+                except AeonResponse as e:
+                    (future := asyncio.get_event_loop().create_future()).set_result(e.response)
+                    await queue.put((request, future, True))
+                    break
+                served += 1
+                last = self._is_last(served) or request.headers.get('connection', '') == 'close'
+                if upgrade := 'upgrade' in request.headers:
+                    # handler takes socket over: previous responses must be sent before
+                    await queue.join()
+                await queue.put((request, task := asyncio.ensure_future(self._process(request)), last))
+                if last:
+                    break
+                if upgrade or request.data_pending:
+                    # handler reads rest of request (or whole socket) itself
+                    await asyncio.wait([task])
+                    if task.cancelled() or not self._keep_alive(request, task.result()):
+                        break
+        finally:
+            # on any error too: consumer must not wait for next request forever
+            queue.put_nowait(None)
+
+    async def _serve_pipelined(self, reader, writer, new_request: Callable[[], Request]) -> None:
+        """
+            serve connection with up to cfg.pipeline_depth requests handled at once
+            responses are sent in order of requests
+        """
+        queue = asyncio.Queue()
+        slots = asyncio.Semaphore(self.cfg.pipeline_depth)
+        read_task = asyncio.ensure_future(self._read_ahead(queue, slots, new_request))
+        try:
+            while True:
+                # nothing is being handled: connection can be closed on shutdown
+                self.set_idle(queue.empty())
+                if (item := await queue.get()) is None:
+                    await asyncio.wait([read_task])
+                    if not read_task.cancelled() and (e := read_task.exception()) is not None:
+                        raise e
+                    break
+                self.set_idle(False)
+                request, future, last = item
+                last = last or self.closing
+                if resp := await future:
+                    await request.logger.debug('gonna send response')
+                    await request.send(resp, {'connection': 'close'} if last else None)
+                queue.task_done()
+                slots.release()
+                if last or not self._keep_alive(request, resp) or writer.is_closing():
+                    break
+        finally:
+            read_task.cancel()
+            while not queue.empty():
+                if item := queue.get_nowait():
+                    item[1].cancel()
+
+    async def reject_connection(self, reader, writer):
+        """
+            answer 503 to connection accepted over max_connections
+        """
+        await AeonResponse(
+            data=SERVICE_UNAVAILABLE,
+            code=503,
+            headers={'Retry-After': '1'},
+            close_conn=True,
+        ).response.write(writer)
+        if writer.can_write_eof():
+            writer.write_eof()
+        # unread request would make socket be reset on close and client could lose response
+        deadline = asyncio.get_event_loop().time() + self.cfg.linger_timeout
+        while (timeout := deadline - asyncio.get_event_loop().time()) > 0:
+            try:
+                if not await asyncio.wait_for(reader.read(2 ** 16), timeout):
+                    break
+            except asyncio.TimeoutError:
+                break
+
     async def client_connected_cb(self, reader, writer):
         _log_extras = '' if writer.get_extra_info('socket').getsockname()[1] != self.cfg.https_port else '[ssl] '
 
         resp = None
         keep_alive = True
+        served = 0
         addr = writer.get_extra_info('peername')
-        await self._logger.debug(_log_extras + f'new connection from {addr[0]}:{addr[1]}')
+        await self._logger.debug('{}new connection from {}:{}', _log_extras, addr[0], addr[1])
         await stats.add('connections', 1)
         try:
+            _ssl = writer.get_extra_info('socket').getsockname()[1] == self.cfg.https_port
+        except Exception as e:
+            await self._logger.error('get_extra_info(\'socket\'): {}', e)
+            _ssl = False
+
+        def new_request() -> Request:
+            return Request(
+                addr=addr,
+                reader=reader,
+                writer=writer,
+                ssl=_ssl,
+                cfg=self._request_cfg,
+            )
+
+        try:
+            if self.cfg.pipeline_depth > 1:
+                await self._serve_pipelined(reader, writer, new_request)
+                keep_alive = False
             while keep_alive:
+                request = new_request()
+                # waiting for next request: connection can be closed on shutdown
+                self.set_idle(True)
                 try:
-                    _ssl = writer.get_extra_info('socket').getsockname()[1] == self.cfg.https_port
-                except Exception as e:
-                    await self._logger.error('get_extra_info(\'socket\'): {}', e)
-                    _ssl = False
-                request = Request(
-                    addr=addr,
-                    reader=reader,
-                    writer=writer,
-                    ssl=_ssl,
-                    **self._request_prop,
-                )
-                try:
-                    await request.read()
+                    # first request is limited by head_timeout
+                    await request.read(idle_timeout=self.cfg.keep_alive_timeout if served else None)
                 except RuntimeError:
+                    # socket closed or idle too long: nothing to answer
                     request.keep_alive = False
+                    resp = None
                 except AeonResponse as e:
+                    self.set_idle(False)
                     resp = e.response
                 else:
-                    await stats.add(key='request_log', value=f'{request.method} {request.url} {request.args}')
-                    resp = await self._handle_request(request)
+                    self.set_idle(False)
+                    resp = await self._process(request)
 
+                served += 1
+                last = self._is_last(served)
                 if resp:
                     await request.logger.debug('gonna send response')
-                    await request.send(resp)
+                    await request.send(resp, {'connection': 'close'} if last else None)
 
-                keep_alive = 'close' not in {
-                    request.headers.get('connection', 'keep-alive'),
-                    resp.headers.get('connection', 'keep-alive') if resp else 'close',
-                } and request.keep_alive and not reader.at_eof() and not writer.is_closing()
+                keep_alive = self._keep_alive(request, resp) and not (
+                    reader.at_eof() or writer.is_closing() or last
+                )
         except Exception as e:
             await self._logger.exception('handler error: {}', e)
         finally:
@@ -164,7 +386,7 @@ class Aeon(AbstractAeon):
             addr=('127.0.0.1', 0),
             reader=None,
             writer=None,
-            **self._request_prop,
+            cfg=self._request_cfg,
         )
         request.init_from_dict(
             AutoCFG(
@@ -187,13 +409,11 @@ class Aeon(AbstractAeon):
         self.namespace[key] = target
 
     def add_middleware(self, target: Callable) -> None:
-        if not callable(target) and not asyncio.iscoroutinefunction(target):
-            raise TypeError(f'target ({target}) must be callable or awatable')
+        self._compile(target)
         self.middleware.append(target)
 
     def add_postware(self, target: Callable) -> None:
-        if not callable(target) and not asyncio.iscoroutinefunction(target):
-            raise TypeError(f'target ({target}) must be callable or awatable')
+        self._compile(target)
         self.postware.append(target)
 
     def add_ws_handler(self, key, target: Type[BaseWSHandler]) -> None:
@@ -36,6 +36,7 @@ class BaseHTTPSession:
 
     defaults = {
         'timeout': None,
+        'stream': False,
     }
 
     def __init__(self, host, port, ssl=False, limit=None, loop=None, **kwargs):
@@ -46,7 +47,7 @@ class BaseHTTPSession:
             **{
                 k: v
                 for k, v in kwargs.items()
-                if k not in {'timeout'}
+                if k not in {'timeout', 'stream'}
             },
         }
         if limit:
@@ -89,19 +90,24 @@ class BaseHTTPSession:
         self._wr = None
 
     async def _request(self, method, url, params=None, data=None, json=None, headers=None, **kwargs):
+        """
+            make request and read answer
+            kwargs:
+                timeout - timeout for reading answer (default: session timeout)
+                stream - if True, body of answer is not loaded but available as
+                    async iterator ClientResponse.stream; it must be consumed
+                    before next request in this session (default: session stream)
+        """
         params = params or {}
         (
             headers := AutoCFG(
-                headers or {},
                 key_modifier=lambda x: x.lower(),
-            )
+            ).update(headers or {})
         ).update_missing(
             {
                 'Host': self._conn_args['host'],
                 'User-Agent': 'AeonClient/1.0',
-                # FIXME
-                # Cannot read data as Content-Length not passed
-                # 'Accept-Encoding': 'gzip',
+                'Accept-Encoding': 'gzip',
             }
         )
         if not data and json:
@@ -168,13 +174,13 @@ class BaseHTTPSession:
         )
         await self._wr.drain()
         return await asyncio.wait_for(
-            self._read_answer(),
+            self._read_answer(stream=kwargs.get('stream', self.cfg.stream)),
             timeout=kwargs.get('timeout') or self.cfg.timeout,
         )
 
-    async def _read_answer(self):
+    async def _read_answer(self, stream=False):
         try:
-            res = await parse_response_data(self._rd, **self.cfg)
+            res = await parse_response_data(self._rd, **dict(self.cfg, stream=stream))
             await self._logger.debug(f'''result: {res.code} {HTTP_CODE_MSG.get(res.code, 'Unknown status')}''')
             return res
         except ValueError:
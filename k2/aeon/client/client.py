@@ -34,6 +34,8 @@ class ClientSession(BaseHTTPSession):
             if res and res.code in {301, 302, 303, 307, 308} and allow_redirects:
                 if (url := res.headers.get('location')) is None:
                     return res
+                # free connection for next request
+                await res.read()
                 await self._logger.debug('rederict to {}', url)
                 if url.startswith('http://') or url.startswith('https://'):
                     host, port = (
@@ -105,6 +107,8 @@ async def _request(method, url, params=None, data=None, json=None, headers=None,
             'Connection': 'close',
         }
     )
+    # session is closed on return, so body is always loaded
+    b.pop('stream', None)
     async with ClientSession(
         host=host,
         port=int(port),
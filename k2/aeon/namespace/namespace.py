@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
 import re
-from typing import Tuple, Dict, Optional, Any
+from collections import OrderedDict
+from typing import Tuple, Dict, Optional, Any, List
+
+try:
+    from re import (
+        _parser as sre_parse,
+        _constants as sre_constants,
+    )
+except ImportError:
+    import sre_parse
+    import sre_constants
 
 from k2.aeon.sitemodules.base import BaseSiteModule
 from k2.aeon.responses import Response
@@ -9,11 +19,22 @@ from k2.utils.autocfg import AutoCFG
 
 
 class NameSpace:
+    """
+        tree of url-regex => module
+        on lookup the longest match wins; subtrees get the rest of url
+        kwargs:
+            cache_size - count of urls to keep resolved (module, args) for; 0 to disable (default: 1024)
+    """
     TYPE_LEAFE = 0
     TYPE_SUBTREE = 1
 
-    def __init__(self, tree=None) -> None:
+    def __init__(self, tree=None, cache_size=1024) -> None:
         self._keys = AutoCFG()
+        # literal prefix trie: char => node; None => list of keys having that prefix
+        self._trie = {}
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._parents = []  # type: List[NameSpace]
         if tree:
             self.create_tree(tree)
 
@@ -39,37 +60,96 @@ class NameSpace:
                     key,
                 )
             )
+        if key not in self._keys:
+            node = self._trie
+            for char in self._literal_prefix(pattern := re.compile(key)):
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(key)
+        else:
+            pattern = self._keys[key]['pattern']
         self._keys[key] = {
             'value': value,
+            'pattern': pattern,
+            'index': len(self._keys) if key not in self._keys else self._keys[key]['index'],
             'type': (
                 self.TYPE_SUBTREE
                 if isinstance(value, (NameSpace, dict)) else
                 self.TYPE_LEAFE
             )
         }
+        if isinstance(value, NameSpace):
+            value._parents.append(self)
+        self._invalidate()
+
+    @staticmethod
+    def _literal_prefix(pattern) -> str:
+        """
+            return literal string every match of pattern must start with
+        """
+        if pattern.flags & re.IGNORECASE:
+            return ''
+        try:
+            parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+        except Exception:
+            return ''
+        prefix = []
+        for op, av in parsed:
+            if op is sre_constants.AT and av in {sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING}:
+                continue
+            if op is not sre_constants.LITERAL:
+                break
+            prefix.append(chr(av))
+        return ''.join(prefix)
+
+    def _invalidate(self) -> None:
+        self._cache.clear()
+        for parent in self._parents:
+            parent._invalidate()
+
+    def _candidates(self, name: str) -> List[str]:
+        """
+            return keys which literal prefixes are prefixes of name
+        """
+        node = self._trie
+        keys = list(node.get(None, []))
+        for char in name:
+            if (node := node.get(char)) is None:
+                break
+            keys.extend(node.get(None, []))
+        return keys
 
     def items(self):
         yield from self._keys.items()
 
     def find_best(self, name, args: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], Optional[Dict[str, str]]]:
-        args = args or {}
+        if args or not self._cache_size:
+            return self._find_best(name, args or {})
+        if (cached := self._cache.get(name)) is None:
+            cached = self._cache[name] = self._find_best(name, {})
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(name)
+        return cached[0], (dict(cached[1]) if cached[1] is not None else None)
+
+    def _find_best(self, name, args: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, str]]]:
         if name in self._keys and self._keys[name]['type'] == self.TYPE_LEAFE:
             return self._keys[name]['value'], args
 
         if not (
              az := [
                 (key, m)
-                for key in self._keys
-                if (m := re.match(key, name))
+                for key in self._candidates(name)
+                if (m := self._keys[key]['pattern'].match(name))
              ]
         ):
             return None, None
 
-        for key, m in sorted(az, key=lambda x: x[1].end() - x[1].start(), reverse=True):
+        for key, m in sorted(az, key=lambda x: (x[1].start() - x[1].end(), self._keys[x[0]]['index'])):
             if self._keys[key]['type'] == self.TYPE_LEAFE:
                 return self._keys[key]['value'], dict(args, **m.groupdict())
             elif (
-                variant := self._keys[key]['value'].find_best(
+                variant := self._keys[key]['value']._find_best(
                     name=name[m.end():],
                     args=dict(args, **m.groupdict()),
                 )
@@ -85,7 +165,7 @@ class NameSpace:
         """
         for key, value in tree.items():
             self[key] = (
-                NameSpace(value)
+                NameSpace(value, cache_size=0)
                 if isinstance(value, (NameSpace, dict)) else
                 value
             )
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 import os
+import re
+import asyncio
+from typing import Optional
 from urllib.parse import (
     urlparse,
-    parse_qs,
     unquote,
 )
 
@@ -10,15 +12,21 @@ from k2.aeon.exceptions import AeonResponse
 from k2.aeon.responses.client.client import ClientResponse
 from k2.utils.autocfg import AutoCFG
 from k2.utils.http import (
+    Headers,
     MAX_DATA_LEN,
     MAX_HEADER_COUNT,
     MAX_HEADER_LEN,
     MAX_URI_LENGTH,
     HTTP_METHODS,
     MAX_STATUS_LENGTH,
-    readln,
+    parse_args,
+    read_head,
+    split_lines,
 )
 
+# chunk-size is hex digits only: no sign, prefix, separators or spaces
+CHUNK_SIZE = re.compile(rb'[0-9A-Fa-f]{1,16}')
+
 PARSE_DATA_DEFAULTS = {
     'max_header_length': MAX_HEADER_LEN,
     'max_header_count': MAX_HEADER_COUNT,
@@ -26,6 +34,11 @@ PARSE_DATA_DEFAULTS = {
     'max_uri_length': MAX_URI_LENGTH,
     'allowed_methods': HTTP_METHODS,
     'allowed_http_version': {'HTTP/1.1'},
+    'stream': False,  # if True, body is not loaded but returned as async iterator in 'stream'
+    'chunk_size': 2 ** 16,
+    'idle_timeout': None,  # seconds to wait for first byte of request; then socket is considered closed
+    'head_timeout': 60.0,  # seconds to read request head; then 408
+    'body_timeout': 60.0,  # seconds to read whole body (or each chunk in stream mode); then 408
 }
 
 PARSE_RESPONSE_DEFAULTS = {
@@ -34,99 +47,191 @@ PARSE_RESPONSE_DEFAULTS = {
     'max_data_length': MAX_DATA_LEN,
     'max_status_length': MAX_STATUS_LENGTH,
     'expected_http_version': {'HTTP/1.1'},
+    'stream': False,  # if True, body is not loaded but returned as async iterator
+    'chunk_size': 2 ** 14,
 }
 
 
-async def parse_data(reader, **kwargs):
+class RequestHead:
     """
-        take io stream and cfg and parse HTTP headers
-        return dict of attributes/headers/url/args
+        parsed request: method, url, http version, body
+        query args and headers are decoded on first access
+    """
+
+    __slots__ = ('method', 'url', 'http_version', 'query', 'raw_headers', 'data', 'stream', '_args', '_headers')
+
+    def __init__(self, method: str, url: str, http_version: str, query: str, raw_headers: list):
+        self.method = method
+        self.url = url
+        self.http_version = http_version
+        self.query = query
+        self.raw_headers = raw_headers  # list of (lower-cased key, value) as bytes
+        self.data = b''
+        self.stream = None
+        self._args = None
+        self._headers = None
+
+    @property
+    def args(self) -> dict:
+        if self._args is None:
+            self._args = parse_args(self.query)
+        return self._args
+
+    @args.setter
+    def args(self, args: dict) -> None:
+        self._args = args
+
+    @property
+    def headers(self) -> Headers:
+        if self._headers is None:
+            self._headers = Headers.from_raw(self.raw_headers)
+        return self._headers
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def header(self, key: str, default=None) -> Optional[str]:
+        """
+            one header without decoding all of them
+        """
+        if self._headers is not None:
+            return self._headers.get(key, default)
+        return Headers.get_raw(self.raw_headers, key, default)
+
+    def as_dict(self) -> dict:
+        """
+            decode everything into plain dict
+        """
+        return dict(
+            {
+                'url': self.url,
+                'args': self.args,
+                'method': self.method,
+                'http_version': self.http_version,
+                'headers': dict(self.headers),
+                'data': self.data,
+            },
+            **({} if self.stream is None else {'stream': self.stream}),
+        )
+
+    def __eq__(self, other) -> bool:
+        return self.as_dict() == (other.as_dict() if isinstance(other, RequestHead) else other)
+
+
+def split_url(url: str):
+    """
+        split request target into path and query
+    """
+    if url.startswith('/'):
+        path, _, query = url.partition('?')
+        return path.partition('#')[0], query.partition('#')[0]
+    # absolute form: http://host/path?query
+    return (parsed_url := urlparse(url)).path, parsed_url.query
+
+
+async def parse_data(reader, **kwargs) -> RequestHead:
+    """
+        take io stream and cfg and parse HTTP head
+        headers are only validated here: they are decoded on demand
+        return RequestHead
     """
     cfg = AutoCFG(PARSE_DATA_DEFAULTS).update_fields(kwargs)
-    req = AutoCFG(
-        {
-            'url': b'',
-            'args': {},
-            'method': b'',
-            'http_version': b'',
-            'headers': AutoCFG(key_modifier=lambda x: x.lower()),
-            'data': b'',
-        }
-    )
     if reader.at_eof():
         raise RuntimeError('socket was closed')
-    if not (st := (
-        await readln(
+    try:
+        head = await read_head(
             reader,
-            max_len=cfg.max_uri_length + 12,
-            ignore_zeros=True,
-            exception=AeonResponse('URI too long', code=414),
+            max_len=cfg.max_uri_length + 12 + cfg.max_header_count * (cfg.max_header_length + 2),
+            exception=AeonResponse('Request head too large', code=413),
+            idle_timeout=cfg.idle_timeout,
+            timeout=cfg.head_timeout,
         )
-        ).strip()
-    ):
+    except asyncio.TimeoutError:
+        raise AeonResponse('Request head timeout', code=408, close_conn=True)
+    if head is None:
+        raise RuntimeError('connection is idle too long')
+    if not (lines := split_lines(head)):
         raise AeonResponse('empty string', code=400, close_conn=True, silent=True)
-    i = 0
-    while len(st) > i and st[i] > 32:
-        i += 1
 
-    req.method = bytes(st[:i]).decode()
-    if not req.method:
+    if len(lines[0]) > cfg.max_uri_length + 12:
+        raise AeonResponse('URI too long', code=414)
+    method, url, http_version, *_ = str(lines[0], 'utf-8').split() + ['', '']
+
+    if not method:
         raise AeonResponse('Empty method field', code=400, close_conn=True, silent=True)
-    elif req.method not in cfg.allowed_methods and '*' not in cfg.allowed_methods:
-        raise AeonResponse(f'Unexpected method "{req.method}"', code=405)
-
-    st = st[i:].lstrip()
-    i = 0
-    while len(st) > i and st[i] > 32:
-        i += 1
-
-    req.url = (parsed_url := urlparse(bytes(st[:i]).decode('utf-8'))).path
-    req.args = {k: v[0] for k, v in parse_qs(parsed_url.query).items() if v}
-    st = st[i:].lstrip()
-
-    i = 0
-    while len(st) > i and st[i] > 32:
-        i += 1
-    req.http_version = bytes(st[:i]).decode('utf-8')
-    if req.http_version not in cfg.allowed_http_version:
-        raise AeonResponse(f'Unexpected HTTP version: {req.http_version}', code=418, close_conn=True)
-
-    err_413 = AeonResponse(code=413)
-    while st := await readln(
-        reader,
-        max_len=cfg.max_header_length,
-        exception=err_413
-    ):
-        if len(st := st.decode('utf-8').split(':')) < 2:
+    elif method not in cfg.allowed_methods and '*' not in cfg.allowed_methods:
+        raise AeonResponse(f'Unexpected method "{method}"', code=405)
+
+    path, query = split_url(url)
+
+    if http_version not in cfg.allowed_http_version:
+        raise AeonResponse(f'Unexpected HTTP version: {http_version}', code=418, close_conn=True)
+
+    if len(lines) > cfg.max_header_count + 1:
+        raise AeonResponse('Too many headers', code=400)
+    raw_headers = []
+    content_length = None
+    transfer_encoding = []
+    for line in lines[1:]:
+        if len(line) > cfg.max_header_length:
+            raise AeonResponse(code=413)
+        key, sep, value = bytes(line).partition(b':')
+        if not sep:
             raise AeonResponse('Http parse error', code=400)
-        if len(req.headers) >= cfg.max_header_count:
-            raise AeonResponse('Too many headers', code=400)
-        req.headers[key] = (
-            ', '.join(
-                [
-                    req.headers[key],
-                    unquote(':'.join(st[1:]).strip()),
-                ]
-            )
-            if (key := st[0].lower()) in req.headers else
-            unquote(':'.join(st[1:]).strip())
-        )
+        raw_headers.append((key := key.lower(), value))
+        # framing headers are needed right now to read body
+        if key == b'content-length':
+            content_length = value
+        elif key == b'transfer-encoding':
+            transfer_encoding.append(value)
 
-    if os.path.normpath(req.url).startswith('..'):
-        raise AeonResponse(f'Unallowed req: {req.url}', code=400, close_conn=True)
-
-    if 'content-length' in req.headers:
-        if (_len := int(req.headers['content-length'])) >= cfg.max_data_length:
-            raise AeonResponse('Too much data', code=413)
-        buff = []
-        length = 0
-        while length < _len:
-            buff.append(await reader.read(_len - length))
-            length += len(buff[-1])
-        req.data = b''.join(buff)
+    if os.path.normpath(path).startswith('..'):
+        raise AeonResponse(f'Unallowed req: {path}', code=400, close_conn=True)
+
+    req = RequestHead(method=method, url=path, http_version=http_version, query=query, raw_headers=raw_headers)
+    if (codings := transfer_codings(b','.join(transfer_encoding))) and codings[-1] != b'chunked':
+        # body length can't be found out (RFC 7230 3.3.3)
+        raise AeonResponse('Invalid transfer-encoding', code=400, close_conn=True)
+    if codings:
+        stream = iter_chunked(
+            reader,
+            max_len=cfg.max_data_length,
+            exception=AeonResponse('Too much data', code=413, close_conn=True),
+        )
+        if cfg.stream:
+            req.stream = stream
+        else:
+            try:
+                req.data = b''.join(await _read_body(_join(stream), cfg.body_timeout))
+            except ValueError:
+                raise AeonResponse('Invalid chunked data', code=400, close_conn=True)
+    elif content_length is not None:
+        if not (content_length := content_length.strip()).isdigit():
+            raise AeonResponse('Invalid content-length', code=400, close_conn=True)
+        _len = int(content_length)
+        if _len >= cfg.max_data_length:
+            raise AeonResponse('Too much data', code=413, close_conn=True)
+        if cfg.stream:
+            req.stream = iter_data(reader, _len, cfg.chunk_size)
+        else:
+            try:
+                req.data = await _read_body(reader.readexactly(_len), cfg.body_timeout)
+            except asyncio.IncompleteReadError:
+                raise AeonResponse('Incomplete data', code=400, close_conn=True)
     return req
 
 
+async def _join(stream):
+    return [chunk async for chunk in stream]
+
+
+async def _read_body(aw, timeout):
+    try:
+        return await (aw if timeout is None else asyncio.wait_for(aw, timeout))
+    except asyncio.TimeoutError:
+        raise AeonResponse('Request body timeout', code=408, close_conn=True)
+
+
 async def parse_response_data(reader, **kwargs):
     """
         take io stream and cfg and parse HTTP headers
@@ -137,14 +242,13 @@ async def parse_response_data(reader, **kwargs):
         raise ValueError('socket was closed')
 
     if not (
-        st := (
-            await readln(
+        lines := split_lines(
+            await read_head(
                 reader,
-                max_len=cfg.max_status_length,
-                ignore_zeros=True,
+                max_len=cfg.max_status_length + cfg.max_header_count * (cfg.max_header_length + 2),
             )
-        ).decode()
-    ) or not st.startswith('HTTP/'):
+        )
+    ) or len(lines[0]) > cfg.max_status_length or not (st := str(lines[0], 'utf-8')).startswith('HTTP/'):
         raise ValueError('Invalid protocol')
 
     version, code, *_ = st.split()
@@ -159,39 +263,107 @@ async def parse_response_data(reader, **kwargs):
         raise ValueError('Invalid status code')
     headers = AutoCFG(key_modifier=lambda x: x.lower())
 
-    for _ in range(cfg.max_header_count):
-        if not (st := (await readln(reader, max_len=cfg.max_header_length)).decode().strip()):
-            break
+    if len(lines) > cfg.max_header_count + 1:
+        raise ValueError('Too many headers')
 
-        key, *value = st.split(':')
-        if not value:
+    for line in lines[1:]:
+        if len(line) > cfg.max_header_length:
+            raise ValueError('line is too long')
+        if not (st := str(line, 'utf-8').strip()):
+            continue
+        key, sep, value = st.partition(':')
+        if not sep:
             raise ValueError('Invalid headers format')
-        value = unquote(':'.join(value).strip())
-        if (key := key.lower()) in headers:
-            headers[key] = ', '.join(
-                [
-                    headers[key],
-                    value,
-                ],
-            )
-        else:
-            headers[key] = value
-
-    if st:
-        raise ValueError('Too many headers')
+        key, value = key.lower(), unquote(value.strip())
+        headers[key] = ', '.join([headers[key], value]) if key in headers else value
 
-    data = []
-    if 'content-length' in headers:
-        if cfg.max_data_length < (content_length := int(headers['content-length'])):
+    data = b''
+    stream = None
+    if is_chunked(headers):
+        stream = iter_chunked(reader, max_len=cfg.max_data_length)
+        if not cfg.stream:
+            data = b''.join([chunk async for chunk in stream])
+            stream = None
+    elif 'content-length' in headers:
+        if not (content_length := headers['content-length'].strip()).isdigit():
+            raise ValueError('Invalid content-length')
+        if cfg.max_data_length < (content_length := int(content_length)):
             raise ValueError('Got unexpectedly much data: {} bytes'.format(content_length))
-        step = 2 ** 14
-        loaded = 0
-        while _l := content_length - loaded:
-            data.append(_d := await reader.read(min(step, content_length - loaded)))
-            loaded += len(_d)
+        if cfg.stream:
+            stream = iter_data(reader, content_length, cfg.chunk_size)
+        else:
+            try:
+                data = await reader.readexactly(content_length)
+            except asyncio.IncompleteReadError:
+                raise ValueError('socket was closed')
     return ClientResponse(
-        data=b''.join(data),
+        data=data,
+        stream=stream,
         headers=headers,
         code=code,
         http_version=version,
     )
+
+
+async def iter_data(reader, length, chunk_size):
+    """
+        async generator over next length bytes of io stream
+        yields chunks of chunk_size bytes or less
+    """
+    while length > 0:
+        if not (chunk := await reader.read(min(chunk_size, length))):
+            raise ValueError('socket was closed')
+        length -= len(chunk)
+        yield chunk
+
+
+def transfer_codings(value):
+    """
+        lower-case codings of transfer-encoding (str or bytes) in order of applying
+    """
+    sep = b',' if isinstance(value, bytes) else ','
+    return [coding for coding in (coding.strip().lower() for coding in value.split(sep)) if coding]
+
+
+def is_chunked(headers) -> bool:
+    """
+        True if chunked is last coding of response
+    """
+    return (codings := transfer_codings(headers.get('transfer-encoding', ''))) != [] and codings[-1] == 'chunked'
+
+
+async def iter_chunked(reader, max_len=None, exception=None):
+    """
+        async generator over body sent with chunked transfer-encoding
+        yields decoded chunks; chunk extensions and trailers are skipped
+        raise ValueError on invalid data
+    """
+    total = 0
+    while True:
+        try:
+            line = await reader.readuntil(b'\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            raise ValueError('invalid chunk size line')
+        size, ext, _ = line[:-2].partition(b';')
+        if not CHUNK_SIZE.fullmatch(size.rstrip(b' \t') if ext else size):
+            raise ValueError('invalid chunk size')
+        if not (size := int(size, 16)):
+            break
+        if max_len is not None and (total := total + size) > max_len:
+            raise ValueError('Got unexpectedly much data') if exception is None else exception
+        try:
+            chunk = await reader.readexactly(size)
+            if await reader.readexactly(2) != b'\r\n':
+                raise ValueError('invalid chunk end')
+        except asyncio.IncompleteReadError:
+            raise ValueError('socket was closed')
+        yield chunk
+
+    try:
+        while await reader.readuntil(b'\r\n') != b'\r\n':
+            pass
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ValueError('invalid trailer')
+    except asyncio.LimitOverrunError:
+        raise ValueError('invalid trailer')
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 
 from .base_request import Request
+from .body import BodyReader
 
 __all__ = [
     'Request',
+    'BodyReader',
 ]
@@ -1,20 +1,25 @@
 #!/usr/bin/env python3
 import time
 import io
+from urllib.parse import urlencode
 from typing import (
+    AsyncIterator,
     Callable,
     List,
     Dict,
+    Optional,
     Tuple,
     Type,
 )
 
 import k2.logger as logger
-from k2.aeon.parser import parse_data
+from k2.aeon.parser import PARSE_DATA_DEFAULTS, RequestHead, parse_data
 from k2.aeon.exceptions import AeonResponse
+from k2.aeon.requests.body import BodyReader
 from k2.aeon.ws.base import BaseWSHandler
 from k2.utils.autocfg import AutoCFG
 from k2.utils import http
+from k2.utils.http import Headers, parse_cookies
 import k2.stats.stats as stats
 
 
@@ -34,6 +39,12 @@ class Request:
             max_data_length - max length of data (default: 8MB)
             allowed_methods -  set/list of allowed HTTP methods (default: {'GET', 'POST', 'HEAD', 'PUT', 'DELETE'})
             allowed_http_version - set/list of allowed HTTP version (default: {'HTTP/1.1'})
+            protocol - dict of kwargs for parser:
+                stream - bool: if True, body is read from socket only by demand:
+                    with iter_data(), readinto() or load_data() (default: False)
+                chunk_size - size of body chunks in stream mode (default: 64KB)
+                head_timeout - seconds to read request head; then 408 (default: 60)
+                body_timeout - seconds to read body (or each chunk in stream mode); then 408 (default: 60)
     """
 
     defaults = {
@@ -46,11 +57,49 @@ class Request:
     # objects must be asyncio.corutines
     postware = []  # type: List[Callable]
 
-    def __init__(self, addr, reader, writer, **kwargs):
+    __slots__ = (
+        '__start_time',
+        '_initialized',
+        'cfg',
+        '_logger',
+        '_addr',
+        '_reader',
+        '_writer',
+        '_source_ip',
+        'port',
+        'keep_alive',
+        '_head',
+        '_url',
+        '_args',
+        '_method',
+        '_http_version',
+        '_headers',
+        '_cookies',
+        '_data',
+        '_body',
+        '_streamed',
+        '_ssl',
+        '_send',
+        '_callback',
+        '_ctx',
+        '__dict__',  # middleware may attach own attributes; dict is made only on first one
+    )
+
+    @classmethod
+    def make_cfg(cls, **kwargs) -> AutoCFG:
+        """
+            build config from kwargs once to share it between requests
+        """
+        return AutoCFG(cls.defaults).update_fields(kwargs)
+
+    def __init__(self, addr, reader, writer, cfg: Optional[AutoCFG] = None, ssl: bool = False, **kwargs):
+        """
+            cfg - config made by make_cfg(); if None, it's made from kwargs
+        """
         self.__start_time = time.time()
         self._initialized = False
-        self.cfg = AutoCFG(self.defaults).update_fields(kwargs)
-        self.logger = logger.new_channel(f'{addr[0]}:{addr[1]}', parent='aeon')
+        self.cfg = self.make_cfg(**kwargs) if cfg is None else cfg
+        self._logger = None
         self._addr = addr
         self._reader = reader
         self._writer = writer
@@ -58,51 +107,84 @@ class Request:
         self.port = self._addr[1]
         self.keep_alive = True
 
-        self._real_ip = self._addr
+        self._head = None
         self._url = None
         self._args = {}
         self._method = None
         self._http_version = None
-        self._headers = {}
+        self._headers = Headers()
+        self._cookies = None
         self._data = b''
-        self._ssl = kwargs.get('ssl', False)
+        self._body = None
+        self._streamed = False
+        self._ssl = ssl
         self._send = False
-        self._callback = {
-            'before_send': [],
-            'after_send': [],
-        }
+        # dict of before_send / after_send callbacks; made on first use
+        self._callback = None
+        self._ctx = None
+
+    @property
+    def ctx(self) -> AutoCFG:
+        """
+            namespace for state of middleware and handlers: request.ctx.user = ...
+            created on first use; attributes may be set on request itself too
+        """
+        if self._ctx is None:
+            self._ctx = AutoCFG()
+        return self._ctx
 
-    def __del__(self):
-        logger.delete_channel(self.logger)
+    @property
+    def logger(self) -> logger.ChannelContext:
+        """
+            channel to log messages about this request with key "ip:port"
+            created on first use
+        """
+        if self._logger is None:
+            self._logger = logger.ChannelContext(
+                key=f'{self._addr[0]}:{self._addr[1]}',
+                parent=logger.get_channel('aeon') or logger.BaseLogger,
+            )
+        return self._logger
 
-    async def read(self):
+    async def read(self, idle_timeout=None):
+        """
+            read request from socket
+            idle_timeout - max seconds to wait for request to start; then RuntimeError is raised
+        """
         try:
-            self.init_from_dict(await parse_data(self._reader, **self.cfg.protocol))
+            self.init_from_dict(
+                await parse_data(
+                    self._reader,
+                    **(
+                        self.cfg.protocol
+                        if idle_timeout is None else
+                        dict(self.cfg.protocol, idle_timeout=idle_timeout)
+                    ),
+                )
+            )
         except UnicodeDecodeError:
             raise AeonResponse(code=400, close_conn=True)
 
     def init_from_dict(self, data):
+        """
+            data - RequestHead or dict-like with same fields
+            args, headers and cookies are taken from data on first access
+        """
+        self._head = data
         self._url = data.url
-        self._args = data.args
+        self._args = None
         self._method = data.method
         self._http_version = data.http_version
-        self._headers = data.headers
+        self._headers = None
+        self._cookies = None
         self._data = data.data
+        self._streamed = (stream := data.get('stream')) is not None
+        self._body = BodyReader(
+            stream,
+            timeout=self.cfg.protocol.get('body_timeout', PARSE_DATA_DEFAULTS['body_timeout']),
+        ) if self._streamed else None
 
-        self._real_ip = (
-            self.headers['x-from-y']
-            if (
-                'x-from-y' in self.headers
-            ) and (
-                self.cfg.believe_x_from_y
-            ) else
-            self._source_ip
-        )
         self._send = False
-        self._callback = {
-            'before_send': [],
-            'after_send': [],
-        }
         self._initialized = True
 
     def get_rw(self) -> Tuple[io.BytesIO, io.BytesIO]:
@@ -112,8 +194,19 @@ class Request:
     def url(self) -> str:
         return self._url
 
+    @property
+    def target(self) -> str:
+        """
+            url with query string as it was requested
+        """
+        if self._head is None or (query := self._head.get('query')) is None:
+            query = urlencode(self.args)
+        return f'{self._url}?{query}' if query else self._url
+
     @property
     def args(self) -> Dict[str, str]:
+        if self._args is None:
+            self._args = self._head.args
         return self._args
 
     @args.setter
@@ -129,9 +222,21 @@ class Request:
         return self._http_version
 
     @property
-    def headers(self) -> Dict[str, str]:
+    def headers(self) -> Headers:
+        """
+            case-insensitive dict of headers
+        """
+        if self._headers is None:
+            headers = self._head.headers
+            self._headers = headers if isinstance(headers, Headers) else Headers(headers)
         return self._headers
 
+    @property
+    def cookies(self) -> Dict[str, str]:
+        if self._cookies is None:
+            self._cookies = parse_cookies(self.headers.get('cookie', ''))
+        return self._cookies
+
     @property
     def data(self) -> bytes:
         return self._data
@@ -140,37 +245,67 @@ class Request:
     def data(self, data):
         self._data = data
 
+    @property
+    def data_pending(self) -> bool:
+        """
+            True if streamed body is not read from socket yet
+        """
+        return self._streamed and not self._body.done
+
+    async def _iter_loaded_data(self) -> AsyncIterator[bytes]:
+        if self._data:
+            yield self._data
+
+    def iter_data(self) -> AsyncIterator[bytes]:
+        """
+            async iterator over body chunks
+        """
+        return self._body.__aiter__() if self._streamed else self._iter_loaded_data()
+
+    async def readinto(self, buffer) -> int:
+        """
+            read next part of body into caller-supplied buffer
+            return count of written bytes; 0 means end of body
+        """
+        if self._body is None:
+            self._body = BodyReader(self._iter_loaded_data())
+        return await self._body.readinto(buffer)
+
+    async def load_data(self) -> bytes:
+        """
+            read rest of streamed body into data
+        """
+        if self.data_pending:
+            self._data = b''.join([self._data, await self._body.read()])
+        return self._data
+
     @property
     def ip(self) -> str:
-        return self._real_ip
+        if self._initialized and self.cfg.believe_x_from_y and (ip := self._header('x-from-y')) is not None:
+            return ip
+        return self._source_ip
+
+    def _header(self, key: str) -> Optional[str]:
+        """
+            one header; others are not decoded if headers were not built yet
+        """
+        if self._headers is None and isinstance(self._head, RequestHead):
+            return self._head.header(key)
+        return self.headers.get(key)
 
     @property
     def ssl(self) -> bool:
         return self._ssl
 
-    async def send(self, resp):
+    async def send(self, resp, extra=None):
+        """
+            write response into socket
+            extra - dict of headers (lower case) to send without changing response
+        """
         try:
-            self._writer.write(await resp.export())
-            total_time = time.time() - self.__start_time
-            f = http.LOG_STRING
-            args = dict(
-                {
-                    k: v(self, resp) if callable(v) else v
-                    for k, v in http.LOG_ARGS.items()
-                },
-                **{
-                    'method': self._method,
-                    'code': resp.code,
-                    'url': self.url,
-                    'args': self.args,
-                    'time': total_time,
-                },
-            )
-            if self.cfg.request_header in self._headers:
-                f = ''.join(['({req_id}) ', f])
-                args.update(req_id=self._headers[self.cfg.request_header])
-
-            await self.logger.info(f, **args)
+            await resp.write(self._writer, extra)
+            if self.logger.is_enabled('info'):
+                await self._log_access(resp)
 
             await stats.add(key=f'aeon-{resp.code // 100}xx')
 
@@ -182,6 +317,32 @@ class Request:
             await self.logger.exception('send response: {}', e)
             self.keep_alive = False
 
+    async def _log_access(self, resp) -> None:
+        """
+            fields are built once: for LOG_STRING and for JSON records (json_file of logger)
+            args are parsed only if LOG_STRING or JSON records use them
+        """
+        f = http.LOG_STRING
+        args = dict(
+            {
+                k: v(self, resp) if callable(v) else v
+                for k, v in http.LOG_ARGS.items()
+            },
+            **{
+                'method': self._method,
+                'code': resp.code,
+                'url': self.url,
+                'time': time.time() - self.__start_time,
+                'ip': self.ip,
+            },
+        )
+        if 'args' in http.format_fields(f) or self.logger.cfg.json_file is not None:
+            args.update(args=self.args)
+        if (req_id := self._header(self.cfg.request_header)) is not None:
+            f = ''.join(['({req_id}) ', f])
+            args.update(req_id=req_id)
+        await self.logger.info(f, **args)
+
     async def upgrade_to_ws(self, target: Type[BaseWSHandler], **kwargs):
         if isinstance(target, type) and not issubclass(target, BaseWSHandler):
             raise TypeError('target ({}) must be subclass of WSHandler', target)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import asyncio
+from typing import AsyncIterator, Optional
+
+from k2.aeon.exceptions import AeonResponse
+
+
+class BodyReader:
+    """
+        lazy reader of request body
+        chunks - async iterator of body chunks (read from socket on demand)
+        timeout - max seconds to wait for each chunk; None for no limit
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], timeout: Optional[float] = None):
+        self._chunks = chunks
+        self._timeout = timeout
+        self._rest = memoryview(b'')
+        self.done = False
+
+    async def _next(self):
+        if self._rest:
+            rest, self._rest = self._rest, memoryview(b'')
+            return rest
+        if self.done:
+            return b''
+        try:
+            return await (
+                self._chunks.__anext__()
+                if self._timeout is None else
+                asyncio.wait_for(self._chunks.__anext__(), self._timeout)
+            )
+        except StopAsyncIteration:
+            self.done = True
+            return b''
+        except ValueError:
+            self.done = True
+            raise AeonResponse('Invalid data', code=400, close_conn=True)
+        except asyncio.TimeoutError:
+            self.done = True
+            raise AeonResponse('Request body timeout', code=408, close_conn=True)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while chunk := await self._next():
+            yield bytes(chunk) if isinstance(chunk, memoryview) else chunk
+
+    async def readinto(self, buffer) -> int:
+        """
+            read next part of body into buffer
+            return count of written bytes; 0 means end of body
+        """
+        view = memoryview(buffer).cast('B')
+        if not (chunk := await self._next()):
+            return 0
+        i = min(len(view), len(chunk))
+        view[:i] = chunk[:i]
+        self._rest = memoryview(chunk)[i:]
+        return i
+
+    async def read(self) -> bytes:
+        """
+            read rest of body
+        """
+        return b''.join([chunk async for chunk in self])
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 
 from .base_response import Response
+from .file import FileResponse
 from .static import StaticResponse
 from .client import ClientResponse
+from .stream import StreamResponse
 
 __all__ = [
     'Response',
+    'FileResponse',
     'ClientResponse',
     'StaticResponse',
+    'StreamResponse',
 ]
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+from typing import Dict, List, Optional, Tuple, Union
 from urllib.parse import quote
 
 from k2.utils.autocfg import AutoCFG
@@ -8,6 +9,32 @@ from k2.utils.http import (
     STANDART_HEADERS,
 )
 
+# body smaller than that is joined with head and written at once
+JOIN_MAX_SIZE = 2 ** 14
+
+# (http_version, code, code for message) => status line
+StatusLines = {}  # type: Dict[Tuple[str, int, int], str]
+
+# cache of formatted STANDART_HEADERS; rebuilt if STANDART_HEADERS changed
+_StandartHeaders = {
+    'source': None,
+    'lines': {},
+}
+
+
+def standart_header_lines() -> Dict[str, str]:
+    """
+        return lower-cased key => formatted header line for each of STANDART_HEADERS
+    """
+    if _StandartHeaders['source'] != (source := tuple(STANDART_HEADERS.items())):
+        _StandartHeaders['lines'] = {
+            key.lower(): ''.join([key.lower(), ': ', str(value), '\r\n'])
+            for key, value in source
+            if key and value
+        }
+        _StandartHeaders['source'] = source
+    return _StandartHeaders['lines']
+
 
 class Response:
     """
@@ -99,44 +126,84 @@ class Response:
             'properties': AutoCFG(kwoptions)
         }
 
-    async def export(self) -> bytes:
-        data = await self._cache_n_zip(
-            data.encode()
-            if isinstance(data := await self._extra_prepare_data(), str) else
-            data
+    def _status_line(self, code) -> str:
+        if (line := StatusLines.get(key := (self.http_version, code, self.code))) is None:
+            line = StatusLines[key] = f'{self.http_version} {code} {HTTP_CODE_MSG[self.code]}\r\n'
+        return line
+
+    @staticmethod
+    def _content_length(code: int, length: int) -> Optional[str]:
+        """
+            1xx, 204 and 304 responses have no content-length: 304 must not override length of cached 200
+        """
+        return None if code < 200 or code in {204, 304} else str(length)
+
+    def _export_head(self, code, extra=None) -> bytes:
+        """
+            build status line, headers and cookies
+            extra - dict of headers to send instead of same ones in self.headers
+        """
+        extra = extra or {}
+        lines = [self._status_line(code)]
+        present = set(extra)
+        for key, value in self._headers.items():
+            if (_key := key.lower()) not in present and key and value:
+                lines.append(''.join([key, ': ', str(value), '\r\n']))
+            present.add(_key)
+        lines.extend(
+            line
+            for key, line in standart_header_lines().items()
+            if key not in present
+        )
+        lines.extend(
+            ''.join([key, ': ', str(value), '\r\n'])
+            for key, value in extra.items()
+            if value
         )
-        headers = self._headers.update_missing(STANDART_HEADERS)
-        headers.update({'Content-Length': len(data)})
-        return b''.join(
-            [
-                '\r\n'.join(
+        lines.extend(
+            'Set-Cookie: {}\r\n'.format(
+                '; '.join(
                     [
-                        f'{self.http_version} '
-                        f'{204 if len(data) <= 0 and self.code in {200, 201} else self.code} '
-                        f'{HTTP_CODE_MSG[self.code]}',
-                        *[
-                            ''.join([key, ': ', str(value)])
-                            for key, value in headers.items()
-                            if key and value
-                        ],
+                        f'''{name}={quote(self._cookies[name]['value'])}''',
                         *[
-                            'Set-Cookie: {}'.format(
-                                '; '.join(
-                                    [
-                                        f'''{name}={quote(self._cookies[name]['value'])}''',
-                                        *[
-                                            f'{key}={quote(str(val))}'
-                                            for key, val in self._cookies[name]['properties'].items()
-                                        ],
-                                        *list(self._cookies[name]['flags'])
-                                    ]
-                                )
-                            )
-                            for name in self._cookies
+                            f'{key}={quote(str(val))}'
+                            for key, val in self._cookies[name]['properties'].items()
                         ],
-                        '\r\n',
+                        *list(self._cookies[name]['flags'])
                     ]
-                ).encode(),
-                data,
-            ]
+                )
+            )
+            for name in self._cookies
+        )
+        lines.append('\r\n')
+        return ''.join(lines).encode()
+
+    async def export_parts(self, extra=None) -> List[Union[bytes, memoryview]]:
+        """
+            return head and body as separate buffers; body is not copied
+            extra - dict of headers (lower case) to send without changing response, e.g. connection: close
+        """
+        data = await self._cache_n_zip(
+            data.encode()
+            if isinstance(data := await self._extra_prepare_data(), str) else
+            data
         )
+        code = 204 if len(data) <= 0 and self.code in {200, 201} else self.code
+        return [
+            self._export_head(code, dict(extra or {}, **{'content-length': self._content_length(code, len(data))})),
+            data,
+        ]
+
+    async def export(self, extra=None) -> bytes:
+        return b''.join(await self.export_parts(extra))
+
+    async def write(self, writer, extra=None) -> None:
+        """
+            write response into io stream
+            big body is passed to transport by separate write, so it's never copied with head
+        """
+        if len((parts := await self.export_parts(extra))[1]) < JOIN_MAX_SIZE:
+            writer.write(b''.join(parts))
+        else:
+            for part in parts:
+                writer.write(part)
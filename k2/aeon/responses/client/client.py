@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
 import gzip
+import zlib
+from typing import AsyncIterator, Optional
 
 try:
     import ujson as json
@@ -11,14 +13,45 @@ from k2.aeon.responses.base_response import Response
 
 
 class ClientResponse(Response):
+    """
+        response got by aeon client
+        if stream passed, body is not loaded:
+            iterate over stream or call read() to load it
+    """
 
-    def __init__(self, **b):
+    def __init__(self, stream: Optional[AsyncIterator[bytes]] = None, **b):
+        self._stream = stream
         try:
-            if 'headers' in b and b.get('data') and b['headers'].get('content-encoding') == 'gzip':
-                b['data'] = gzip.decompress(b['data'])
+            if 'headers' in b and b['headers'].get('content-encoding') == 'gzip':
+                if stream is not None:
+                    self._stream = self._gunzip(stream)
+                elif b.get('data'):
+                    b['data'] = gzip.decompress(b['data'])
         finally:
             super().__init__(**b)
 
+    @staticmethod
+    async def _gunzip(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        async for chunk in stream:
+            if data := decompressor.decompress(chunk):
+                yield data
+        if data := decompressor.flush():
+            yield data
+
+    @property
+    def stream(self) -> Optional[AsyncIterator[bytes]]:
+        return self._stream
+
+    async def read(self) -> bytes:
+        """
+            load rest of streamed body into data
+        """
+        if self._stream is not None:
+            self._data = b''.join([chunk async for chunk in self._stream])
+            self._stream = None
+        return self._data
+
     @property
     def ok(self):
         return 200 <= self.code < 300
@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+
+from .file import FileResponse
+
+__all__ = [
+    'FileResponse',
+]
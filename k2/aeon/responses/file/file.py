@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+import asyncio
+import uuid
+from typing import List, Optional, Tuple
+
+from k2.aeon.responses.base_response import Response
+from k2.utils.fileio import FileIO, get_file_io
+from k2.utils.http import content_type
+
+
+async def send_file(writer, filename: str, offset: int, count: int, file_io: Optional[FileIO] = None) -> None:
+    """
+        send part of file into io stream
+        uses os.sendfile() for plain sockets and chunked reads otherwise (e.g. for TLS)
+    """
+    if not count:
+        return
+    f = await (file_io := file_io or get_file_io()).open(filename)
+    try:
+        await asyncio.get_event_loop().sendfile(writer.transport, f, offset, count, fallback=True)
+    finally:
+        await file_io.run(f.close)
+
+
+class FileResponse(Response):
+    """
+        response with body sent directly from file
+        file is never loaded into memory
+        filename - path to file
+        offset - first byte to send (default: 0)
+        count - count of bytes to send (default: up to end of file)
+        file_io - k2.utils.fileio.FileIO for disk operations (default: shared one)
+    """
+
+    def __init__(
+        self,
+        filename: Optional[str] = None,
+        offset: int = 0,
+        count: Optional[int] = None,
+        file_io: Optional[FileIO] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._file_io = file_io
+        # [filename, offset, count] if body is sent from file
+        self._file = None
+        # [(part head, offset, count), ...] + closing delimiter for multipart/byteranges body
+        self._parts = None
+        self._tail = b''
+        if filename is not None:
+            self.set_file(filename, offset=offset, count=count)
+
+    @property
+    def file_io(self) -> FileIO:
+        return self._file_io or get_file_io()
+
+    def set_file(self, filename: str, offset: int = 0, count: Optional[int] = None) -> None:
+        """
+            count - if None, will be got on sending
+        """
+        self._file = [filename, offset, count]
+        self._parts = None
+        self._headers.update_missing(content_type(filename))
+
+    def set_ranges(self, filename: str, ranges: List[Tuple[int, int]], size: int) -> None:
+        """
+            send parts of file as 206 Partial Content
+            ranges - non-empty list of (offset, count)
+            size - full size of file
+            single range is sent as is, multiple ones as multipart/byteranges
+        """
+        self.code = 206
+        if len(ranges) == 1:
+            offset, count = ranges[0]
+            self.set_file(filename, offset=offset, count=count)
+            self._headers.update({'Content-Range': f'bytes {offset}-{offset + count - 1}/{size}'})
+            return
+        _type = content_type(filename)['Content-type']
+        for key in [key for key in self._headers if key.lower() == 'content-type']:
+            _type = self._headers.pop(key)
+        boundary = uuid.uuid4().hex
+        self._parts = [
+            (
+                ''.join(
+                    [
+                        '\r\n' if i else '',
+                        f'--{boundary}\r\n',
+                        f'Content-Type: {_type}\r\n',
+                        f'Content-Range: bytes {offset}-{offset + count - 1}/{size}\r\n\r\n',
+                    ]
+                ).encode(),
+                offset,
+                count,
+            )
+            for i, (offset, count) in enumerate(ranges)
+        ]
+        self._tail = f'\r\n--{boundary}--\r\n'.encode()
+        self._file = [filename, 0, sum(len(head) + count for head, _, count in self._parts) + len(self._tail)]
+        self._headers.update({'Content-Type': f'multipart/byteranges; boundary={boundary}'})
+
+    async def _export_file_head(self, extra=None) -> bytes:
+        if self._file[2] is None:
+            self._file[2] = (await self.file_io.stat(self._file[0])).st_size - self._file[1]
+        code = 204 if self._file[2] <= 0 and self.code in {200, 201} else self.code
+        return self._export_head(code, dict(extra or {}, **{'content-length': self._content_length(code, self._file[2])}))
+
+    async def export_parts(self, extra=None) -> List[bytes]:
+        if self._file is None:
+            return await super().export_parts(extra)
+        if self._parts is not None:
+            body = []
+            for head, offset, count in self._parts:
+                body.extend([head, await self.file_io.read(self._file[0], offset, count)])
+            return [await self._export_file_head(extra), b''.join(body + [self._tail])]
+        return [
+            await self._export_file_head(extra),
+            await self.file_io.read(*self._file),
+        ]
+
+    async def write(self, writer, extra=None) -> None:
+        if self._file is None:
+            return await super().write(writer, extra)
+        writer.write(await self._export_file_head(extra))
+        if self._parts is None:
+            await writer.drain()
+            return await send_file(writer, *self._file, file_io=self.file_io)
+        for head, offset, count in self._parts:
+            writer.write(head)
+            await writer.drain()
+            await send_file(writer, self._file[0], offset, count, file_io=self.file_io)
+        writer.write(self._tail)
@@ -1,18 +1,24 @@
 #!/use/bin/env python3
-import os
 import sys
+import stat
 import gzip
+import asyncio
+import hashlib
+import functools
 
-from k2.aeon.responses.base_response import Response
+from k2.aeon.responses.file.file import FileResponse
 from k2.aeon.script_runner import ScriptRunner
-from k2.utils.autocfg import (
-    AutoCFG,
-    CacheDict,
-)
+from k2.utils.autocfg import AutoCFG
+from k2.utils.cache import LRUCache
 from k2.utils.http import (
     SMTH_HAPPENED,
     NOT_FOUND,
     CONTENT_HTML,
+    choose_encoding,
+    http_date,
+    not_modified,
+    parse_http_date,
+    parse_range,
     content_type as content_type,
 )
 
@@ -20,24 +26,70 @@ from k2.utils.http import (
 BIN = 'binary'
 TEXT = 'text'
 
-# key - <public> + '@' + 'path'
-# or <private> + ':' + uid + '@' + 'path'
-ServerCache = CacheDict(timeout=120 * ('--no-cache' not in sys.argv))
+# encoding => function (data, level -> compressed data)
+COMPRESSORS = {
+    'gzip': lambda data, level: gzip.compress(data, compresslevel=level),
+}
+
+# encoding => extension of precompressed sibling file
+PRECOMPRESSED_EXTENSIONS = {
+    'br': '.br',
+    'gzip': '.gz',
+}
+
+# key - <public> + '@' + 'path' + '#' + encoding
+# or <private> + ':' + uid + '@' + 'path' + '#' + encoding
+# limits can be changed with ServerCache.update_limits()
+ServerCache = LRUCache(
+    timeout=120 * ('--no-cache' not in sys.argv),
+    max_size=64 * (2 ** 20),
+    sizeof=lambda item: len(item['data']),
+    stats_key='static_server_cache',
+)
+
+# (filename, size, mtime) => content hash; used for etag='hash'
+ETagCache = LRUCache(max_count=2 ** 12)
+
+# headers sent with 304 Not Modified
+NOT_MODIFIED_HEADERS = ('content-type', 'etag', 'last-modified', 'cache-control', 'vary')
 
 STATIC_RESPONSE_DEFAULTS = {
     'cache_min': 120,  # max-age
     'cache_public': True,  # public/private
     'cache_of_uid': None,  # if cache is private and server_cache -> uid of owner
-    'max_response_size': (2 ** 18),  # <=> chunk size
+    'max_response_size': (2 ** 18),  # bigger text files are sent from disk as is (no scripts and compression)
     'server_cache': True,  # cache on server
-    'compress': 'gzip',  # compress data; allowed: 'gzip' or None
+    'cache': None,  # k2.utils.cache.LRUCache for server cache; None for shared ServerCache
+    'compress': 'gzip',  # compress text data; allowed: 'gzip' or None
+    'compress_level': 6,
+    'compress_executor_size': 2 ** 16,  # bigger data is compressed in thread pool
+    'compress_executor': None,  # concurrent.futures.Executor for compression; None for loop's default one
+    'precompressed': ('br', 'gzip'),  # serve <file>.br / <file>.gz if client accepts it
+    'file_io': None,  # k2.utils.fileio.FileIO for disk operations; None for shared one
+    'etag': 'stat',  # 'stat' - from size and mtime; 'hash' - from content (once per file version); None to disable
+    'last_modified': True,  # send Last-Modified and check If-Modified-Since
 }
 
 
-class StaticResponse(Response):
+def _hash_file(filename: str) -> str:
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        while chunk := f.read(2 ** 16):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _encoded_etag(etag: str, encoding: str) -> str:
+    """
+        etag of same file compressed with encoding
+    """
+    return etag if encoding == 'identity' else f'{etag[:-1]}-{encoding}"'
+
+
+class StaticResponse(FileResponse):
     def __init__(self, request, **kwargs):
-        super().__init__()
         self.cfg = AutoCFG(STATIC_RESPONSE_DEFAULTS).update_fields(kwargs)
+        super().__init__(file_io=self.cfg.file_io)
         self.content_mod = None
         self.vars = dict(
             {
@@ -48,20 +100,103 @@ class StaticResponse(Response):
         self.req = request
         self._data = ''
         self._cached = False
+        self._etag = None
+        # encoding for compression on the fly
+        self._encoding = (
+            choose_encoding(
+                request.headers.get('accept-encoding', ''),
+                [self.cfg.compress] if self.cfg.compress in COMPRESSORS else [],
+            ) or 'identity'
+        ) if request else 'identity'
 
-    def __get_cache_key(self):
+    @property
+    def server_cache(self) -> LRUCache:
+        return ServerCache if self.cfg.cache is None else self.cfg.cache
+
+    def __get_cache_key(self, encoding):
         if not self.cfg.cache_public and self.cfg.cache_of_uid is None:
             raise ValueError('UID must be set for private cache')
         return ''.join(
-            ['public@', self.req.url, '?', str(self.req.args)]
+            ['public@', self.req.url, '?', str(self.req.args), '#', encoding]
             if self.cfg.cache_public else
-            ['private:', str(self.cfg.cache_of_uid), '@', self.req.url, '?', str(self.req.args)]
+            ['private:', str(self.cfg.cache_of_uid), '@', self.req.url, '?', str(self.req.args), '#', encoding]
         )
 
+    async def _find_precompressed(self, filename):
+        """
+            return (encoding, filename, size) of acceptable precompressed sibling or None
+        """
+        if not self.cfg.precompressed or 'range' in self.req.headers:
+            return None
+        encoding = choose_encoding(self.req.headers.get('accept-encoding', ''), self.cfg.precompressed)
+        if encoding not in PRECOMPRESSED_EXTENSIONS:
+            return None
+        st = await self.file_io.stat(filename := filename + PRECOMPRESSED_EXTENSIONS[encoding])
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return None
+        return encoding, filename, st.st_size
+
+    async def _validators(self, filename, st) -> dict:
+        """
+            return ETag and Last-Modified headers of file
+        """
+        headers = {}
+        if self.cfg.etag == 'hash':
+            if (tag := ETagCache.get(key := (filename, st.st_size, st.st_mtime_ns))) is None:
+                tag = ETagCache[key] = await self.file_io.run(_hash_file, filename)
+            headers['ETag'] = self._etag = f'"{tag}"'
+        elif self.cfg.etag == 'stat':
+            headers['ETag'] = self._etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        if self.cfg.last_modified:
+            headers['Last-Modified'] = http_date(st.st_mtime)
+        return headers
+
+    def _not_modified(self, headers) -> bool:
+        """
+            headers - headers of response that would be sent
+            if client's copy is still valid, turn response into 304 and return True
+        """
+        headers = {key.lower(): value for key, value in headers.items()}
+        if (
+            self.req is None
+            or self.req.method not in {'GET', 'HEAD'}
+            or not not_modified(
+                self.req.headers,
+                headers.get('etag'),
+                parse_http_date(headers['last-modified']) if 'last-modified' in headers else None,
+            )
+        ):
+            return False
+        self.headers.update({key: headers[key] for key in NOT_MODIFIED_HEADERS if key in headers})
+        self._data = b''
+        self._cached = True
+        self.code = 304
+        return True
+
+    def _ranges(self, size, headers):
+        """
+            return list of (offset, count) requested by client,
+                empty list if ranges are unsatisfiable
+                or None if whole file must be sent
+        """
+        if self.req is None or self.req.method != 'GET' or 'range' not in self.req.headers:
+            return None
+        if (if_range := self.req.headers.get('if-range')) is not None and (
+            if_range.strip() not in {headers.get('ETag'), headers.get('Last-Modified')}
+        ):
+            # client's copy is outdated
+            return None
+        return parse_range(self.req.headers['range'], size)
+
     async def _run_scripts(self):
         if self.content_mod == TEXT and self._data:
-            if await (sr := ScriptRunner(text=self._data, logger=self.req.logger, args=self.vars)).run():
-                self._data = sr.export()
+            source = (sr := ScriptRunner(text=self._data, logger=self.req.logger, args=self.vars)).text
+            if await sr.run():
+                if (data := sr.export()) != source:
+                    # generated content can't be validated by file's stat
+                    self.headers.pop('etag', None)
+                    self.headers.pop('last-modified', None)
+                self._data = data
             else:
                 self._data = SMTH_HAPPENED
                 self.code = 500
@@ -75,7 +210,10 @@ class StaticResponse(Response):
         if self.cfg.server_cache:
             await self.req.logger.debug('get file from cache')
             try:
-                self._data = (data := ServerCache[self.__get_cache_key()])['data']
+                data = self.server_cache[self.__get_cache_key(self._encoding)]
+                if self._not_modified(data['headers']):
+                    return True
+                self._data = data['data']
                 self.headers.update(data['headers'])
                 self.code = data['code']
                 self._cached = True
@@ -83,32 +221,8 @@ class StaticResponse(Response):
             except KeyError:
                 pass
 
-        if os.path.isfile(filename):
-            await self.req.logger.debug(f'send file "{filename}"')
-            size = os.path.getsize(filename)
-            if not self.cfg.max_response_size or size <= self.cfg.max_response_size:
-                with open(filename, 'rb') as f:
-                    self._data = f.read()
-                _code = 200
-            else:
-                _from = 0
-                _to = self.cfg.max_response_size
-                if self.req and 'range' in self.req.headers:
-                    if (tmp := self.req.headers['range'].split('='))[0] == 'bytes':
-                        a, b = tmp[1].split('-')
-                        _from = int(a) if a else 0
-                        _to = int(b) if b else (_from + self.cfg.max_response_size)
-                with open(filename, 'rb') as f:
-                    if _from > 0:
-                        f.read(_from)
-                    self._data = f.read(_to - _from)
-                    self.add_headers(
-                        {
-                            'Content-Range': f'bytes={_from}-{_to}/{size}',
-                        }
-                    )
-                _code = 206
-            await self.req.logger.debug(f'file "{filename}" loaded: {len(self._data)}b')
+        if (st := await self.file_io.stat(filename)) is not None and stat.S_ISREG(st.st_mode):
+            await self.req.logger.debug('send file "{}"', filename)
             headers = content_type(filename)
             self.content_mod = (
                 TEXT
@@ -117,15 +231,55 @@ class StaticResponse(Response):
                 ).startswith('text') else
                 BIN
             )
+            size = st.st_size
             headers['Cache-Control'] = 'max-age={cache_min}, {cache_public}'.format(
                 cache_min=self.cfg.cache_min,
                 cache_public='public' if self.cfg.cache_public else 'private'
             )
-            self.headers.update(headers)
-            self.code = _code
+            headers.update(await self._validators(filename, st))
+            if precompressed := await self._find_precompressed(filename):
+                encoding = precompressed[0]
+                headers['Vary'] = 'Accept-Encoding'
+            elif self.content_mod == TEXT and 0 < size <= (self.cfg.max_response_size or size):
+                encoding = self._encoding
+                headers['Vary'] = 'Accept-Encoding'
+            else:
+                encoding = 'identity'
+            if 'ETag' in headers:
+                headers['ETag'] = _encoded_etag(headers['ETag'], encoding)
+            if self._not_modified(headers):
+                await self.req.logger.debug('file "{}" not modified', filename)
+                return True
+            self.code = 200
+            if precompressed:
+                encoding, _filename, _size = precompressed
+                await self.req.logger.debug('send precompressed file "{}"', _filename)
+                headers['Content-Encoding'] = encoding
+                self.headers.update(headers)
+                self.set_file(_filename, count=_size)
+            elif self.content_mod == BIN or (self.cfg.max_response_size and size > self.cfg.max_response_size):
+                # sent from disk as is
+                self.headers.update(headers)
+                if (ranges := self._ranges(size, headers)) is None:
+                    self.set_file(filename, count=size)
+                elif ranges:
+                    await self.req.logger.debug('send {} range(s) of file "{}"', len(ranges), filename)
+                    self.set_ranges(filename, ranges, size)
+                else:
+                    self.headers.update({'Content-Range': f'bytes */{size}'})
+                    self._data = b''
+                    self._cached = True
+                    self.code = 416
+            else:
+                # compressed on the fly; ETag of encoding is set with Content-Encoding
+                if 'ETag' in headers:
+                    headers['ETag'] = self._etag
+                self.headers.update(headers)
+                self._data = await self.file_io.read(filename)
+                await self.req.logger.debug('file "{}" loaded: {}b', filename, len(self._data))
             return True
         else:
-            await self.req.logger.debug(f'file not found "{filename}"')
+            await self.req.logger.debug('file not found "{}"', filename)
             self._data = NOT_FOUND
             self.add_headers(CONTENT_HTML)
             self.code = 404
@@ -135,21 +289,41 @@ class StaticResponse(Response):
         self.code = 307 + permanent
         self.add_headers(Location=url)
 
+    async def _compress(self, data):
+        compress = functools.partial(COMPRESSORS[self._encoding], data, self.cfg.compress_level)
+        if len(data) < self.cfg.compress_executor_size:
+            return compress()
+        return await asyncio.get_event_loop().run_in_executor(self.cfg.compress_executor, compress)
+
     async def _cache_n_zip(self, data):
+        if self._cached:
+            return data
+        identity = data
         if self.content_mod == TEXT:
-            if 'gzip' not in self.req.headers.get('accept-encoding', ''):
-                return data
-            if self.cfg.compress == 'gzip':
-                await self.req.logger.debug('compress data {} -> {}', len(data), len(data := gzip.compress(data)))
-                self.headers['Content-Encoding'] = 'gzip'
+            self.headers.update({'Vary': 'Accept-Encoding'})
+            if self._encoding in COMPRESSORS and data:
+                size, data = len(data), await self._compress(data)
+                await self.req.logger.debug('compress data {} -> {}', size, len(data))
+                self.headers.update({'Content-Encoding': self._encoding})
+                if 'ETag' in self.headers:
+                    self.headers.update({'ETag': _encoded_etag(self._etag, self._encoding)})
 
         if self.cfg.server_cache and self.code not in {204, 206}:
             await self.req.logger.debug('save data to cache')
-            ServerCache[self.__get_cache_key()] = {
+            self.server_cache[self.__get_cache_key(self._encoding)] = {
                 'data': data,
-                'headers': self.headers,
+                'headers': dict(self.headers),
                 'code': self.code,
             }
+            if data is not identity:
+                self.server_cache[self.__get_cache_key('identity')] = {
+                    'data': identity,
+                    'headers': dict(
+                        {k: v for k, v in self.headers.items() if k != 'content-encoding'},
+                        **({'etag': self._etag} if 'ETag' in self.headers else {}),
+                    ),
+                    'code': self.code,
+                }
         return data
 
     async def _extra_prepare_data(self):
@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+
+from .stream import StreamResponse
+
+__all__ = [
+    'StreamResponse',
+]
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+from typing import (
+    AsyncIterable,
+    Iterable,
+    Union,
+)
+
+from k2.aeon.responses.base_response import Response
+
+CHUNKED_END = b'0\r\n\r\n'
+
+
+class StreamResponse(Response):
+    """
+        response with body of unknown length
+        body is sent with chunked transfer-encoding
+        stream - iterable or async iterable of str/bytes chunks
+    """
+
+    def __init__(self, stream: Union[Iterable, AsyncIterable], **kwargs):
+        super().__init__(**kwargs)
+        self._stream = stream
+
+    @property
+    def stream(self) -> Union[Iterable, AsyncIterable]:
+        return self._stream
+
+    async def _iter_chunks(self):
+        if hasattr(self._stream, '__aiter__'):
+            async for chunk in self._stream:
+                if chunk:
+                    yield chunk.encode() if isinstance(chunk, str) else chunk
+        else:
+            for chunk in self._stream:
+                if chunk:
+                    yield chunk.encode() if isinstance(chunk, str) else chunk
+
+    def _export_chunked_head(self, extra=None) -> bytes:
+        return self._export_head(
+            self.code,
+            dict(extra or {}, **{'content-length': None, 'transfer-encoding': 'chunked'}),
+        )
+
+    async def export(self, extra=None) -> bytes:
+        """
+            load whole stream and return it as single chunked body
+        """
+        return b''.join(
+            [
+                self._export_chunked_head(extra),
+                *[
+                    b''.join([b'%x\r\n' % len(chunk), chunk, b'\r\n'])
+                    async for chunk in self._iter_chunks()
+                ],
+                CHUNKED_END,
+            ]
+        )
+
+    async def write(self, writer, extra=None) -> None:
+        """
+            write head and each chunk as soon as it's ready
+        """
+        writer.write(self._export_chunked_head(extra))
+        async for chunk in self._iter_chunks():
+            writer.writelines([b'%x\r\n' % len(chunk), chunk, b'\r\n'])
+            await writer.drain()
+        writer.write(CHUNKED_END)
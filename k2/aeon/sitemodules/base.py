@@ -6,6 +6,12 @@ from k2.utils.tools import call_corofunc
 
 
 class BaseSiteModule:
+    # route-specific wares run after server-wide ones: callables or asyncio.coroutines
+    middleware = ()
+    postware = ()
+    # server-wide wares (or their names) not to run for this route
+    skip_ware = ()
+
     async def handle(self, request, **args):
         return (
             await call_corofunc(getattr(self, f_name), request, **args)
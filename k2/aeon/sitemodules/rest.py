@@ -26,6 +26,7 @@ class RestSM(SiteModule):
             return
         if (deserializer := getattr(self, 'deserializer', json.loads)) is None:
             return
+        await request.load_data()
         try:
             if isinstance(data := getter(request), (str, bytes)):
                 data = deserializer(data)
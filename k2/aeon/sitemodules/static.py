@@ -1,15 +1,33 @@
 #!/usr/bin/env python3
-import os
+import stat
+from typing import Optional
 
 from k2.aeon.responses import (
     Response,
     StaticResponse,
 )
 from k2.aeon.sitemodules.sm import SiteModule
+from k2.utils.cache import LRUCache
+from k2.utils.fileio import FileIO, get_file_io
 
 
 class StaticSiteModule(SiteModule):
-    def __init__(self, static_root, show_index=False, chunk_size=(2 ** 18), allow_links=False, cache_min=120):
+    def __init__(
+        self,
+        static_root,
+        show_index=False,
+        chunk_size=(2 ** 18),
+        allow_links=False,
+        cache_min=120,
+        file_io: Optional[FileIO] = None,
+        cache: Optional[LRUCache] = None,
+    ):
+        """
+            file_io - k2.utils.fileio.FileIO for disk operations (default: shared one)
+            cache - k2.utils.cache.LRUCache for loaded files (default: shared StaticResponse's ServerCache)
+        """
+        self._file_io = file_io
+        self._cache = cache
         self._static_root = static_root
         self._show_index = show_index
         self._chunk_size = chunk_size
@@ -20,21 +38,25 @@ class StaticSiteModule(SiteModule):
         headers = {}
         code = 404
         data = b''
-        if os.path.isfile(filename := self._static_root + req.url):
+        file_io = self._file_io or get_file_io()
+        st = await file_io.stat(filename := self._static_root + req.url)
+        if st is not None and stat.S_ISREG(st.st_mode):
             resp = StaticResponse(
                 request=req,
                 cache_min=self._cache_min,
                 max_response_size=self._chunk_size,
+                file_io=self._file_io,
+                cache=self._cache,
             )
             await resp.load_static_file(
                 filename=filename,
             )
             return resp
-        elif self._show_index and os.path.isdir(filename):
+        elif self._show_index and st is not None and stat.S_ISDIR(st.st_mode):
             urls = []
             url = req.url.rstrip('/')
-            for _fn in os.listdir(filename):
-                if os.path.isdir(fn := ''.join([filename, _fn])):
+            for _fn, is_dir, is_link, is_file in await file_io.scandir(filename):
+                if is_dir:
                     urls.append(
                         {
                             'name': _fn,
@@ -42,7 +64,7 @@ class StaticSiteModule(SiteModule):
                             'url': '/'.join([url, _fn, '']),
                         }
                     )
-                elif os.path.islink(fn):
+                elif is_link:
                     if self._allow_links:
                         urls.append(
                             {
@@ -51,7 +73,7 @@ class StaticSiteModule(SiteModule):
                                 'url': '/'.join([url, _fn]),
                             }
                         )
-                elif os.path.isfile(fn):
+                elif is_file:
                     urls.append(
                         {
                             'name': _fn,
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import shutil
+import signal
+import asyncio
+import tempfile
+import traceback
+from typing import Dict, List
+
+import k2.stats.stats as stats
+from k2.utils.autocfg import AutoCFG
+
+SUPERVISOR_DEFAULTS = {
+    'restart_delay': 1.0,  # seconds before restart of crashed worker
+    'stop_timeout': 30.0,  # seconds for worker to stop after SIGTERM; then it's killed
+    'stats_interval': 1.0,  # seconds between snapshots of worker's stats; 0 to disable sharing
+    'stats_dir': None,  # directory for snapshots of stats; None for temporary one
+    'poll_interval': 0.1,  # seconds between checks of workers and signals
+}
+
+
+class Supervisor:
+    """
+        pre-fork process manager
+        forks aeon.cfg.workers processes that serve same listening sockets
+        crashed workers are restarted
+        signals:
+            SIGTERM, SIGINT - stop workers and exit
+            SIGHUP - rolling reload: workers are replaced one by one
+        stats of all workers are shared, so k2.stats.export_all() (StatsCGI) returns them together
+    """
+
+    def __init__(self, aeon, **kwargs):
+        self.cfg = AutoCFG(SUPERVISOR_DEFAULTS).update_fields(kwargs)
+        self._aeon = aeon
+        self._sockets = []
+        # pid => index of worker
+        self._workers = {}  # type: Dict[int, int]
+        # pid => deadline of retiring worker
+        self._retiring = {}  # type: Dict[int, float]
+        # index => time to restart worker
+        self._pending = {}  # type: Dict[int, float]
+        # pids of workers to replace during reload
+        self._reload = []  # type: List[int]
+        self._stopping = False
+        self._stats_dir = None
+
+    @property
+    def workers(self) -> Dict[int, int]:
+        return dict(self._workers)
+
+    async def _share_stats(self):
+        while True:
+            await asyncio.get_event_loop().run_in_executor(None, stats.save_snapshot)
+            await asyncio.sleep(self.cfg.stats_interval)
+
+    def _worker(self, index: int) -> None:
+        """
+            body of forked worker
+        """
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        # Ctrl+C is sent to whole process group; workers are stopped by supervisor
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        tasks = []
+        if self._stats_dir is not None:
+            stats.share(self._stats_dir, name=f'worker-{index}')
+            tasks.append(self._share_stats())
+        self._aeon.run_worker(self._sockets, tasks=tasks)
+
+    def _spawn(self, index: int) -> int:
+        if not (pid := os.fork()):
+            code = 0
+            try:
+                self._worker(index)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        self._workers[pid] = index
+        return pid
+
+    def _kill(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _retire(self, pid: int) -> None:
+        self._retiring[pid] = time.monotonic() + self.cfg.stop_timeout
+        self._kill(pid, signal.SIGTERM)
+
+    def _reap(self) -> None:
+        while self._workers:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if not pid:
+                break
+            if (index := self._workers.pop(pid, None)) is None:
+                continue
+            if self._retiring.pop(pid, None) is None and not self._stopping:
+                # crashed: restart it later
+                self._pending[index] = time.monotonic() + self.cfg.restart_delay
+
+    def _on_stop(self, *_):
+        self._stopping = True
+
+    def _on_reload(self, *_):
+        self._reload = list(self._workers)
+
+    def _step(self) -> None:
+        self._reap()
+        now = time.monotonic()
+        if self._stopping:
+            for pid in self._workers:
+                if pid not in self._retiring:
+                    self._retire(pid)
+            self._pending.clear()
+            self._reload.clear()
+        for index, ts in list(self._pending.items()):
+            if ts <= now:
+                del self._pending[index]
+                self._spawn(index)
+        if self._reload and not self._retiring:
+            # rolling reload: start new worker first, then stop old one
+            if (index := self._workers.get(pid := self._reload.pop(0))) is not None:
+                self._spawn(index)
+                self._retire(pid)
+        for pid, deadline in list(self._retiring.items()):
+            if deadline <= now:
+                self._kill(pid, signal.SIGKILL)
+
+    def run(self) -> None:
+        self._sockets = self._aeon.listen()
+        if self.cfg.stats_interval:
+            self._stats_dir = self.cfg.stats_dir or tempfile.mkdtemp(prefix='k2-stats-')
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        try:
+            for index in range(self._aeon.cfg.workers):
+                self._spawn(index)
+            while self._workers or (self._pending and not self._stopping):
+                self._step()
+                time.sleep(self.cfg.poll_interval)
+        finally:
+            for pid in self._workers:
+                self._kill(pid, signal.SIGKILL)
+            for sock, _ in self._sockets:
+                sock.close()
+            if self._stats_dir is not None and self.cfg.stats_dir is None:
+                shutil.rmtree(self._stats_dir, ignore_errors=True)
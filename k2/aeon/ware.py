@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import k2.stats.stats as stats
+from k2.utils.tools import LIST_MUTATORS, notify_changes
+
+# stat key => ware it belongs to
+WareStats = {}  # type: Dict[str, Callable]
+
+
+def ware_name(ware: Callable) -> str:
+    return getattr(ware, '__qualname__', None) or type(ware).__qualname__
+
+
+def ware_stat_key(ware: Callable) -> str:
+    """
+        return key of stat "ware-<name>" of ware and create stat once
+        wares with same name (e.g. lambdas) get "-<id>" suffix to not share stat
+    """
+    key = f'ware-{ware_name(ware)}'
+    if (owner := WareStats.setdefault(key, ware)) is not ware:
+        key = f'{key}-{id(ware):x}'
+        owner = WareStats.setdefault(key, ware)
+    if key not in stats.Collection:
+        stats.new(key=key, type='average', description=f'seconds spent in {ware_name(owner)}')
+    return key
+
+
+def compile_ware(ware: Callable, timing: bool = True) -> Callable[..., Awaitable]:
+    """
+        make coroutine function calling ware: sync or async is resolved here once
+        timing - if True, seconds spent in each call are added to stat ware_stat_key(ware)
+    """
+    if not callable(ware) and not asyncio.iscoroutinefunction(ware):
+        raise TypeError(f'ware ({ware}) must be callable or awatable')
+    if asyncio.iscoroutinefunction(ware) or asyncio.iscoroutinefunction(getattr(ware, '__call__', None)):
+        func = ware
+    else:
+        async def func(*a, **b):
+            ware(*a, **b)
+    if not timing:
+        return func
+
+    key = ware_stat_key(ware)
+
+    async def timed(*a, **b):
+        _t = time.perf_counter()
+        try:
+            await func(*a, **b)
+        finally:
+            stats.add_nowait(key, time.perf_counter() - _t)
+    return timed
+
+
+@notify_changes(*LIST_MUTATORS)
+class WareList(list):
+    """
+        list of server-wide wares; on_change is called after each change of it
+    """
+
+    def __init__(self, wares: Iterable[Callable] = (), on_change: Optional[Callable[[], None]] = None) -> None:
+        super().__init__(wares)
+        self.on_change = on_change
+
+    def _changed(self) -> None:
+        if self.on_change is not None:
+            self.on_change()
+
+
+class WareChain:
+    """
+        middleware or postware compiled for one route
+        call it with kwargs for each ware
+    """
+
+    __slots__ = ('_wares',)
+
+    def __init__(self, wares: Iterable[Callable[..., Awaitable]]) -> None:
+        self._wares = tuple(wares)  # type: tuple
+
+    def __bool__(self) -> bool:
+        return bool(self._wares)
+
+    def __len__(self) -> int:
+        return len(self._wares)
+
+    async def __call__(self, **kwargs) -> None:
+        for ware in self._wares:
+            await ware(**kwargs)
+
+
+def select_wares(wares: List[Callable], route, kind: str) -> List[Callable]:
+    """
+        server-wide wares for route without route's skip_ware plus route's own ones
+        skip_ware may contain wares or their names
+        kind - 'middleware' or 'postware'
+    """
+    skip = getattr(route, 'skip_ware', None) or ()
+    return [
+        ware
+        for ware in wares
+        if ware not in skip and ware_name(ware) not in skip
+    ] + list(getattr(route, kind, None) or ())
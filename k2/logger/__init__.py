@@ -11,7 +11,11 @@ from .logger import (
     get_channel,
     clear,
     export,
+    flush,
+    update_writer,
+    writers_stats,
     BaseLogger,
+    ChannelContext,
 )
 
 __all__ = [
@@ -25,5 +29,9 @@ __all__ = [
     'get_channel',
     'clear',
     'export',
+    'flush',
+    'update_writer',
+    'writers_stats',
     'BaseLogger',
+    'ChannelContext',
 ]
@@ -4,21 +4,26 @@ import sys
 import time
 import asyncio
 import logging
+import weakref
 import traceback
-from typing import Dict, Tuple, Any, Union, List, Optional, Iterable
-from multiprocessing import (
-    Lock,
-    synchronize,
-)
+from collections import deque
+from itertools import takewhile
+from typing import Callable, Deque, Dict, Tuple, Any, Union, List, Optional, Iterable
 
-from k2.utils.autocfg import AutoCFG
+try:
+    from ujson import dumps
+except ImportError:
+    from json import dumps
+from json import dumps as _safe_dumps
 
-Locks = {}  # type: Dict[str, synchronize.Lock]
+from k2.logger.writer import get_writer
+from k2.utils.autocfg import AutoCFG
+from k2.utils.tools import SET_MUTATORS, notify_changes
 
 CHANNEL_DEFAULTS = {
     'key': None,
-    'timeout': 3600,
-    'limit': 1000,
+    'timeout': 3600,  # seconds to keep records in memory; None for no limit
+    'limit': 1000,  # max count of records kept in memory; None for no limit
     'autosave': '--no-log' not in sys.argv,
     'log_file': 'log.txt',
     'callback': None,
@@ -26,13 +31,154 @@ CHANNEL_DEFAULTS = {
     'time_format': '%d.%m.%Y %H:%M:%S',
     'log_levels': {'info', 'warning', 'error'}.union({'debug'} if '--debug' in sys.argv else set()),
     'log_format': '{timestamp} -:- {level} [{key}] {msg}',
+    'json_file': None,  # file for newline-delimited JSON records ('-' for stdout); None to disable
 }
 
+# values of other types are written to JSON records as str()
+JSON_TYPES = (str, int, float, bool, type(None), dict, list, tuple)
+
+
+def json_record(timestamp: float, level: str, key: str, msg: str, fields: Dict[str, Any]) -> str:
+    """
+        serialize record with fields (format kwargs of message) as one JSON line
+    """
+    record = {k: v if isinstance(v, JSON_TYPES) else str(v) for k, v in fields.items()}
+    record.update(timestamp=timestamp, level=level, key=key, msg=msg)
+    try:
+        return dumps(record)
+    except (TypeError, OverflowError, ValueError):
+        # unserializable value deeper in fields
+        return _safe_dumps(record, default=str)
+
+
+@notify_changes(*SET_MUTATORS)
+class LogLevels(set):
+    """
+        levels of channel; on_change is called after each change of it
+    """
+
+    def __init__(self, levels: Iterable[str] = (), on_change: Optional[Callable[[], None]] = None) -> None:
+        super().__init__(levels)
+        self.on_change = on_change
+
+    def _changed(self) -> None:
+        if self.on_change is not None:
+            self.on_change()
+
+
+class ChannelCFG(AutoCFG):
+    """
+        config of channel; log_levels is always own LogLevels of channel
+        so changing it in any way (cfg.log_levels = ..., cfg.log_levels.add(...)) calls on_change
+    """
+
+    def __init__(self, *a, on_change: Optional[Callable[[], None]] = None, **b):
+        super().__init__(*a, **b)
+        object.__setattr__(self, 'on_change', on_change)
+        # set from defaults is shared: channel gets own copy
+        self._own_levels()
+
+    def _own_levels(self) -> None:
+        if 'log_levels' in self:
+            dict.__setitem__(self, 'log_levels', LogLevels(self['log_levels'], self.on_change))
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if key == 'log_levels':
+            self._own_levels()
+            if self.on_change is not None:
+                self.on_change()
+
+    def update(self, *args, **kwargs):
+        levels = self.get('log_levels')
+        super().update(*args, **kwargs)
+        if self.get('log_levels') is not levels:
+            self._own_levels()
+            if self.on_change is not None:
+                self.on_change()
+        return self
+
+
+class LogMethods:
+    """
+        level shortcuts over log()
+        message is formatted only if its level is enabled
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def __form_msg_(msg: str, *a, **b):
+        if isinstance(msg, str):
+            return msg.format(*a, **b)
+        else:
+            return ', '.join(
+                [
+                    str(i)
+                    for i in [msg] + list(a) + list(b.items())
+                ]
+            )
+
+    def is_enabled(self, level: str) -> bool:
+        """
+            True if messages of level are logged: check it before building expensive messages
+        """
+        return level in self.cfg.log_levels
+
+    async def exception(self, msg: str, *args, **kwargs):
+        if (level := kwargs.get('level', 'error')) not in self.cfg.log_levels:
+            return
+        await self.log(
+            msg=''.join([self.__form_msg_(msg, *args, **kwargs), '\n', *traceback.format_exception(*sys.exc_info())]),
+            level=level,
+            args=args,
+            kwargs=kwargs,
+        )
+
+    async def error(self, msg: str, *args, **kwargs):
+        if 'error' in self.cfg.log_levels:
+            await self.log(
+                msg=self.__form_msg_(msg, *args, **kwargs),
+                level='error',
+                args=args,
+                kwargs=kwargs,
+            )
+
+    async def warning(self, msg: str, *args, **kwargs):
+        if 'warning' in self.cfg.log_levels:
+            await self.log(
+                msg=self.__form_msg_(msg, *args, **kwargs),
+                level='warning',
+                args=args,
+                kwargs=kwargs,
+            )
+
+    async def info(self, msg: str, *args, **kwargs):
+        if 'info' in self.cfg.log_levels:
+            await self.log(
+                msg=self.__form_msg_(msg, *args, **kwargs),
+                level='info',
+                args=args,
+                kwargs=kwargs,
+            )
+
+    async def debug(self, msg: str, *args, **kwargs):
+        if 'debug' in self.cfg.log_levels:
+            await self.log(
+                msg=self.__form_msg_(msg, *args, **kwargs),
+                level='debug',
+                args=args,
+                kwargs=kwargs,
+            )
 
-class Channel:
+
+class Channel(LogMethods):
 
     def __init__(self, **kwargs) -> None:
-        self.cfg = AutoCFG(CHANNEL_DEFAULTS).update_fields(kwargs)
+        # channels which have this one as parent: their sinks depend on config of this one
+        self._children = weakref.WeakSet()  # type: weakref.WeakSet
+        self._sinks_cache = {}  # type: Dict[str, Tuple[Channel, ...]]
+        self.cfg = ChannelCFG(CHANNEL_DEFAULTS, on_change=self._invalidate).update_fields(kwargs)
         if self.cfg.key is not None:
             if any((re.match(f'--stdout=.*{self.cfg.key}.*', x) is not None for x in sys.argv)):
                 self.cfg.stdout = True
@@ -41,22 +187,26 @@ class Channel:
             if any((re.match(f'--no-log=.*{self.cfg.key}.*', x) is not None for x in sys.argv)):
                 self.cfg.autosave = False
 
-        if self.cfg.autosave and self.cfg.log_file not in Locks:
-            Locks[self.cfg.log_file] = Lock()
         self.parents = []  # type: List[Dict[str, Union[Channel, Iterable]]]
-        self._logs = []  # type: List[Dict[str, Union[str, int]]]
+        # oldest records are dropped when there are more than cfg.limit of them
+        self._logs = deque(maxlen=self.cfg.limit)  # type: Deque[Dict[str, Union[str, float]]]
         self._t = 0
         self._logger = logging.Logger(self.cfg.key)
 
     def _clear(self) -> None:
-        if self._t != (_t := int(time.time())):
+        """
+            drop records older than cfg.timeout seconds; checked once a second
+        """
+        if self._t != (_t := int(time.time())) and self.cfg.timeout is not None:
             self._t = _t
             _t -= self.cfg.timeout
-            while self._logs and self._logs[0]['timestamp'] > _t:
-                self._logs.pop(0)
+            while self._logs and self._logs[0]['timestamp'] < _t:
+                self._logs.popleft()
 
     def update(self, **kwargs) -> None:
         self.cfg.update_fields(kwargs)
+        if self._logs.maxlen != self.cfg.limit:
+            self._logs = deque(self._logs, maxlen=self.cfg.limit)
 
     def add_parent(self, parent, inherite_rights: Optional[Iterable] = None) -> None:
         if inherite_rights is None:
@@ -71,6 +221,40 @@ class Channel:
             self.cfg[i] |= parent.cfg[i]
         if 'log_levels' in inherite_rights:
             self.cfg.log_levels.update(parent.cfg.log_levels)
+        parent._children.add(self)
+        self._invalidate()
+
+    def _invalidate(self) -> None:
+        """
+            drop cached sinks of this channel and all its descendants
+        """
+        queue = deque([self])
+        seen = set()
+        while queue:
+            if id(channel := queue.popleft()) not in seen:
+                seen.add(id(channel))
+                channel._sinks_cache.clear()
+                queue.extend(channel._children)
+
+    def _sinks(self, level: str) -> Tuple['Channel', ...]:
+        """
+            this channel and its ancestors which get records of level
+            a record goes up only through channels accepting its level; each channel gets it once
+            resolved once per level until levels or parents of this channel or its ancestors are changed
+        """
+        if (sinks := self._sinks_cache.get(level)) is None:
+            sinks = [self]
+            seen = {id(self)}
+            queue = deque(parent['parent'] for parent in self.parents)
+            while queue:
+                if id(channel := queue.popleft()) in seen:
+                    continue
+                seen.add(id(channel))
+                if level in channel.cfg.log_levels:
+                    sinks.append(channel)
+                    queue.extend(parent['parent'] for parent in channel.parents)
+            sinks = self._sinks_cache[level] = tuple(sinks)
+        return sinks
 
     async def log(
         self,
@@ -79,111 +263,106 @@ class Channel:
         args: Tuple[Any, ...],
         kwargs: Dict[str, Any],
         from_child: bool = False,
+        key: Optional[str] = None,
     ) -> None:
+        """
+            record is formatted once with this channel's format and key
+            and then it's stored by this channel and all ancestors accepting level
+            key - name to log message with instead of channel's key
+            from_child - if True, message is not printed and not saved to file
+        """
         if level not in self.cfg.log_levels:
             return
-        args = args or tuple()
-        kwargs = kwargs or {}
         log_msg = self.cfg.log_format.format(
             timestamp=time.strftime(self.cfg.time_format, time.localtime(timestamp := time.time())),
             level=level,
-            key=self.cfg.key,
+            key=(key := self.cfg.key if key is None else key),
             msg=msg,
         )
-
-        self._logs.append(
-            {
-                'timestamp': timestamp,
-                'log_msg': log_msg,
-            }
-        )
+        record = {
+            'timestamp': timestamp,
+            'level': level,
+            'log_msg': log_msg,
+        }
         if not from_child:
             if self.cfg.stdout:
                 print(log_msg)
             if self.cfg.autosave:
-                with Locks[self.cfg.log_file]:
-                    with open(self.cfg.log_file, 'a') as f:
-                        f.write(''.join([log_msg, '\n']))
-        if self.cfg.callback is not None:
-            params = {
-                'key': self.cfg.key,
-                'level': level,
-                'raw_msg': msg,
-                'log_msg': log_msg,
-            }
+                get_writer(self.cfg.log_file).write(''.join([log_msg, '\n']))
+            if (json_file := self.cfg.json_file) is not None:
+                line = json_record(timestamp, level, key, msg, kwargs or {})
+                if json_file == '-':
+                    print(line)
+                else:
+                    get_writer(json_file).write(''.join([line, '\n']))
 
-            if asyncio.iscoroutinefunction(self.cfg.callback):
-                await self.cfg.callback(**params)
-            elif callable(self.cfg.callback):
-                self.cfg.callback(**params)
-
-        await asyncio.gather(
-            *[
-                parent['parent'].log(
-                    msg=msg,
-                    level=level,
-                    args=args,
-                    kwargs=kwargs,
-                    from_child=True,
-                )
-                for parent in self.parents
-            ]
-        )
+        for channel in self._sinks(level):
+            channel._logs.append(record)
+            channel._clear()
+            if (callback := channel.cfg.callback) is not None:
+                params = {
+                    'key': channel.cfg.key,
+                    'level': level,
+                    'raw_msg': msg,
+                    'log_msg': log_msg,
+                }
+                if asyncio.iscoroutinefunction(callback):
+                    await callback(**params)
+                elif callable(callback):
+                    callback(**params)
 
-    @staticmethod
-    def __form_msg_(msg: str, *a, **b):
-        if isinstance(msg, str):
-            return msg.format(*a, **b)
+    def clear(self):
+        self._logs.clear()
+
+    def export(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        level: Optional[Union[str, Iterable[str]]] = None,
+    ) -> List[Dict[str, Union[str, float]]]:
+        """
+            stored records from oldest to newest: {'timestamp', 'level', 'log_msg'}
+            since / until - range of timestamps (inclusive)
+            level - level or collection of levels to take
+        """
+        self._clear()
+        if since is None:
+            records = list(self._logs)
         else:
-            return ', '.join(
-                [
-                    str(i)
-                    for i in [msg] + list(a) + list(b.items())
-                ]
-            )
+            # newest records are at the end: scan only them
+            records = list(takewhile(lambda record: record['timestamp'] >= since, reversed(self._logs)))
+            records.reverse()
+        if until is not None:
+            records = [record for record in records if record['timestamp'] <= until]
+        if level is not None:
+            levels = {level} if isinstance(level, str) else set(level)
+            records = [record for record in records if record['level'] in levels]
+        return records
 
-    async def exception(self, msg: str, *args, **kwargs):
-        await self.log(
-            msg=''.join([self.__form_msg_(msg, *args, **kwargs), '\n', *traceback.format_exception(*sys.exc_info())]),
-            level=kwargs.get('level', 'error'),
-            args=args,
-            kwargs=kwargs,
-        )
 
-    async def error(self, msg: str, *args, **kwargs):
-        await self.log(
-            msg=self.__form_msg_(msg, *args, **kwargs),
-            level='error',
-            args=args,
-            kwargs=kwargs,
-        )
+class ChannelContext(LogMethods):
+    """
+        lightweight channel for short-living objects (like requests)
+        messages are logged by parent channel with own key
+        nothing is created or registered: config, files and callbacks are parent's
+    """
 
-    async def warning(self, msg: str, *args, **kwargs):
-        await self.log(
-            msg=self.__form_msg_(msg, *args, **kwargs),
-            level='warning',
-            args=args,
-            kwargs=kwargs,
-        )
+    __slots__ = ('key', 'parent')
 
-    async def info(self, msg: str, *args, **kwargs):
-        await self.log(
-            msg=self.__form_msg_(msg, *args, **kwargs),
-            level='info',
-            args=args,
-            kwargs=kwargs,
-        )
+    def __init__(self, key: str, parent: Channel) -> None:
+        self.key = key
+        self.parent = parent
 
-    async def debug(self, msg: str, *args, **kwargs):
-        await self.log(
-            msg=self.__form_msg_(msg, *args, **kwargs),
-            level='debug',
-            args=args,
-            kwargs=kwargs,
-        )
+    @property
+    def cfg(self) -> AutoCFG:
+        return self.parent.cfg
 
-    def clear(self):
-        self._logs.clear()
-
-    def export(self) -> List[Dict[str, Union[str, int]]]:
-        return self._logs
+    async def log(
+        self,
+        msg: str,
+        level: str,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        from_child: bool = False,
+    ) -> None:
+        await self.parent.log(msg=msg, level=level, args=args, kwargs=kwargs, from_child=from_child, key=self.key)
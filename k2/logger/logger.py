@@ -2,7 +2,8 @@
 
 from typing import Optional, Dict, Iterable, Any, Union, List
 
-from .channel import Channel
+from .channel import Channel, ChannelContext
+from .writer import Writers, flush_all, get_writer
 
 
 # key - channel name
@@ -88,10 +89,40 @@ def clear() -> None:
     return Channels.clear()
 
 
-def export(key: str) -> List[Dict[str, Union[str, int]]]:
+def export(key: str, **kwargs) -> List[Dict[str, Union[str, float]]]:
+    """
+        kwargs - filters for Channel.export(): since, until, level
+    """
     if key in Channels:
-        return Channels[key].export()
+        return Channels[key].export(**kwargs)
     raise KeyError(f'channel "{key}" not exists')
 
 
+def flush() -> None:
+    """
+        write all queued log lines to files right now
+    """
+    flush_all()
+
+
+def update_writer(log_file: str, **kwargs) -> None:
+    """
+        configure background writer of log file: max_queue, flush_size, flush_interval
+    """
+    get_writer(log_file).update(**kwargs)
+
+
+def writers_stats() -> Dict[str, Dict[str, int]]:
+    """
+        log file => {'queued': lines waiting to be written, 'dropped': lines lost}
+    """
+    return {
+        log_file: {
+            'queued': writer.queued,
+            'dropped': writer.dropped,
+        }
+        for log_file, writer in Writers.items()
+    }
+
+
 BaseLogger = new_channel('base_logger')
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import os
+import atexit
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+from k2.utils.autocfg import AutoCFG
+
+WRITER_DEFAULTS = {
+    'max_queue': 100000,  # lines waiting to be written; new ones are dropped when queue is full
+    'flush_size': 2 ** 16,  # bytes in queue to write them at once without waiting for flush_interval
+    'flush_interval': 0.5,  # seconds between writes
+}
+
+
+class LogWriter:
+    """
+        writes lines to log file in background thread
+        lines are batched; file is kept open
+        write() never blocks caller: it only puts line into queue
+    """
+
+    def __init__(self, filename: str, **kwargs) -> None:
+        self.cfg = AutoCFG(WRITER_DEFAULTS).update_fields(kwargs)
+        self.filename = filename
+        self.dropped = 0
+        self._queue = deque()  # type: deque
+        self._size = 0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._thread = None  # type: Optional[threading.Thread]
+        self._stop = False
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def update(self, **kwargs) -> None:
+        self.cfg.update_fields(kwargs)
+
+    def write(self, line: str) -> bool:
+        """
+            put line into queue
+            return False if it was dropped because queue is full
+        """
+        with self._cond:
+            if self._thread is None:
+                self._start()
+            if len(self._queue) >= self.cfg.max_queue:
+                self.dropped += 1
+                return False
+            self._queue.append(line)
+            if (size := self._size + len(line)) >= self.cfg.flush_size > self._size:
+                self._cond.notify()
+            self._size = size
+        return True
+
+    def _start(self) -> None:
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name=f'log-writer {self.filename}', daemon=True)
+        self._thread.start()
+
+    def _take(self) -> List[str]:
+        batch = list(self._queue)
+        self._queue.clear()
+        self._size = 0
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stop or self._size >= self.cfg.flush_size, self.cfg.flush_interval)
+                batch, stop = self._take(), self._stop
+            self._write(batch)
+            if stop:
+                break
+
+    def _write(self, batch: List[str]) -> None:
+        if not batch:
+            return
+        with self._write_lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.filename, 'a')
+                self._file.write(''.join(batch))
+                self._file.flush()
+            except (OSError, ValueError):
+                self.dropped += len(batch)
+                self._close_file()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def flush(self) -> None:
+        """
+            write queued lines right now in caller's thread
+        """
+        with self._cond:
+            batch = self._take()
+        self._write(batch)
+
+    def close(self) -> None:
+        """
+            stop background thread, write queued lines and close file
+        """
+        if (thread := self._thread) is not None:
+            with self._cond:
+                self._stop = True
+                self._cond.notify()
+            thread.join()
+            self._thread = None
+        self.flush()
+        with self._write_lock:
+            self._close_file()
+
+    def _after_fork(self) -> None:
+        # thread is not copied to child; lines queued by parent are written by parent
+        self._queue.clear()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._thread = None
+
+
+# log file => LogWriter
+Writers = {}  # type: Dict[str, LogWriter]
+
+
+def get_writer(filename: str) -> LogWriter:
+    if (writer := Writers.get(filename)) is None:
+        writer = Writers[filename] = LogWriter(filename)
+    return writer
+
+
+def flush_all() -> None:
+    for writer in list(Writers.values()):
+        writer.flush()
+
+
+def close_all() -> None:
+    for writer in list(Writers.values()):
+        writer.close()
+
+
+def _after_fork() -> None:
+    for writer in Writers.values():
+        writer._after_fork()
+
+
+atexit.register(close_all)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -4,16 +4,26 @@ from .stats import (
     new,
     update,
     add,
+    add_nowait,
     reset,
     export_one,
     export,
+    export_all,
+    merge,
+    share,
+    save_snapshot,
 )
 
 __all__ = [
     'new',
     'update',
     'add',
+    'add_nowait',
     'reset',
     'export_one',
     'export',
+    'export_all',
+    'merge',
+    'share',
+    'save_snapshot',
 ]
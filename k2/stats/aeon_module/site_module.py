@@ -10,7 +10,7 @@ from k2.aeon import (
     SiteModule,
 )
 from k2.stats import (
-    export,
+    export_all,
     reset,
 )
 from k2.utils.autocfg import AutoCFG
@@ -38,13 +38,12 @@ class StatsCGI(SiteModule):
 
         return await super().handle(request, **args)
 
-    @staticmethod
-    def get():
+    async def get(self, req):
         return Response(
             data=dumps(
                 {
                     'status': 'ok',
-                    'data': export(),
+                    'data': await export_all(),
                 }
             ),
             code=200,
@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
+import os
 import asyncio
+from collections import Counter as _Counter
 from dataclasses import dataclass
-from typing import Any, Dict, Callable, Optional
+from typing import Any, Dict, Callable, List, Optional
+
+try:
+    from ujson import dumps, loads
+except ImportError:
+    from json import dumps, loads
 
 from k2.stats.types import (
     Single,
@@ -32,6 +39,13 @@ class Stat:
 
 Collection = {}  # type: Dict[str, Stat]
 
+# stats of this process are shared with other processes (pre-fork workers)
+# via snapshots <path>/<name>.json; path is None if stats are not shared
+Shared = {
+    'path': None,
+    'name': None,
+}
+
 STATS_TYPE_COUNTER = Counter._type
 STATS_TYPE_SINGLE = Single._type
 STATS_TYPE_AVERAGE = Average._type
@@ -89,6 +103,18 @@ async def add(key: str, *a, **b) -> None:
     await __callback('add', key, *a, **b)
 
 
+def add_nowait(key: str, *a, **b) -> None:
+    """
+        same as add() but for sync code
+        callback (if any) is scheduled as task
+    """
+    if key not in Collection:
+        raise KeyError(f'stat "{key}" does not exists')
+    Collection[key].obj.add(*a, **b)
+    if Collection[key].callback:
+        asyncio.ensure_future(__callback('add', key, *a, **b))
+
+
 async def reset(key: Optional[str] = None) -> None:
     if key:
         if key not in Collection:
@@ -120,3 +146,121 @@ def export() -> Dict[str, Dict[str, Any]]:
         key: __do_export(key)
         for key in Collection
     }
+
+
+def _merge_sum(options: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return dict(options[0], data=sum(opt['data'] for opt in options))
+
+
+def _merge_counters(options: List[Dict[str, Any]]) -> Dict[str, Any]:
+    data = _Counter()
+    for opt in options:
+        # keys of snapshots loaded from JSON are str: live ones must match them
+        data.update({str(key): value for key, value in opt['data'].items()})
+    res = dict(options[0], data=dict(data))
+    if 'count' in res:
+        res['count'] = len(data)
+    return res
+
+
+def _merge_average(options: List[Dict[str, Any]]) -> Dict[str, Any]:
+    options = [opt for opt in options if opt.get('count')] or options[:1]
+    count = sum(opt.get('count', 0) for opt in options)
+    return dict(
+        options[0],
+        data=sum(opt['data'] * opt['count'] for opt in options) / count if count else options[0]['data'],
+        count=count,
+    )
+
+
+def _merge_events(options: List[Dict[str, Any]]) -> Dict[str, Any]:
+    data = sorted((event for opt in options for event in opt['data']), key=lambda event: event['timestamp'])
+    return dict(options[0], data=data, count=len(data))
+
+
+def _merge_last(options: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return next((opt for opt in reversed(options) if opt['data'] is not None), options[-1])
+
+
+# stat type => function (list of options() of same stat from all processes -> merged options)
+MergeMap = {
+    STATS_TYPE_COUNTER: _merge_sum,
+    STATS_TYPE_SINGLE: _merge_last,
+    STATS_TYPE_AVERAGE: _merge_average,
+    STATS_TYPE_TIMEEVENTS: _merge_events,
+    STATS_TYPE_TIMEAVERAGE: _merge_average,
+    STATS_TYPE_EVENTCOUNTER: _merge_counters,
+    STATS_TYPE_TIMEEVENTCOUNTER: _merge_counters,
+}
+
+
+def merge(exports: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """
+        exports - process name => result of export() in this process
+        return export() of all processes together:
+            counters are summed up, averages are weighted, events are joined
+            values of each process are kept in "processes"
+    """
+    res = {}
+    for name, export in exports.items():
+        for key, item in export.items():
+            if key not in res:
+                res[key] = dict(item, processes={})
+            res[key]['processes'][name] = item['data']
+    for item in res.values():
+        if merge_func := MergeMap.get(item['type']):
+            item['data'] = merge_func(list(item['processes'].values()))
+    return res
+
+
+def share(path: Optional[str], name: Optional[str] = None) -> None:
+    """
+        share stats of this process with other processes
+        path - directory for snapshots; None to stop sharing
+        name - unique name of process (default: pid)
+    """
+    Shared.update(
+        path=path,
+        name=name or str(os.getpid()),
+    )
+
+
+def save_snapshot() -> None:
+    """
+        write export() of this process into shared directory
+        does blocking io: run it in executor
+    """
+    if Shared['path'] is None:
+        return
+    filename = os.path.join(Shared['path'], Shared['name'] + '.json')
+    with open(tmp := filename + '.tmp', 'w') as f:
+        f.write(dumps(export()))
+    os.replace(tmp, filename)
+
+
+def load_snapshots() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+        return process name => last saved export() of every process sharing stats
+        does blocking io: run it in executor
+    """
+    res = {}
+    for filename in os.listdir(Shared['path']) if Shared['path'] is not None else []:
+        if filename.endswith('.json'):
+            try:
+                with open(os.path.join(Shared['path'], filename)) as f:
+                    res[filename[:-5]] = loads(f.read())
+            except (OSError, ValueError):
+                # being replaced or removed right now
+                continue
+    return res
+
+
+async def export_all() -> Dict[str, Dict[str, Any]]:
+    """
+        same as export() but for all processes sharing stats
+    """
+    if Shared['path'] is None:
+        return export()
+    exports = await asyncio.get_event_loop().run_in_executor(None, load_snapshots)
+    exports[Shared['name']] = export()
+    return merge(exports)
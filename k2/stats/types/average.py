@@ -22,7 +22,7 @@ class Average(AbstractStat):
         self._value = []
 
     def export(self):
-        return sum(self._value) / len(self._value)
+        return sum(self._value) / len(self._value) if self._value else None
 
     def options(self):
         (d := super().options()).update(
@@ -15,4 +15,4 @@ class TimeAverage(Average):
             self._value.pop(0)
 
     def export(self):
-        return sum(j for _, j in self._value) / len(self._value)
+        return sum(j for _, j in self._value) / len(self._value) if self._value else None
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, Tuple
+
+import k2.stats.stats as stats
+
+LRU_CACHE_DEFAULTS = {
+    'timeout': None,
+    'max_size': None,
+    'max_count': None,
+    'sizeof': len,
+    'stats_key': None,
+}
+
+
+class LRUCache:
+    """
+        dict-like cache with byte budget, LRU eviction and time to live
+        kwargs:
+            timeout - time to live for single value in seconds; None for no limit
+            max_size - budget in bytes (as measured by sizeof); None for no limit
+            max_count - max count of values; None for no limit
+            sizeof - function (value -> size in bytes) (default: len)
+            stats_key - key of k2.stats event_counter for hit/miss/eviction/expiration; None to disable
+    """
+
+    def __init__(self, **kwargs):
+        self.timeout = kwargs.get('timeout', LRU_CACHE_DEFAULTS['timeout'])
+        self.max_size = kwargs.get('max_size', LRU_CACHE_DEFAULTS['max_size'])
+        self.max_count = kwargs.get('max_count', LRU_CACHE_DEFAULTS['max_count'])
+        self.sizeof = kwargs.get('sizeof', LRU_CACHE_DEFAULTS['sizeof'])
+        self.stats_key = kwargs.get('stats_key', LRU_CACHE_DEFAULTS['stats_key'])
+        # key => (value, size, insertion time); from least to most recently used
+        self._data = OrderedDict()  # type: OrderedDict[Hashable, Tuple[Any, int, float]]
+        # (insertion time, key) in order of insertion <=> in order of expiration for any timeout
+        # kept only while timeout is set
+        self._expirations = deque()  # type: Deque[Tuple[float, Hashable]]
+        self._size = 0
+        if self.stats_key is not None:
+            stats.new(key=self.stats_key, type='event_counter', description='cache hits/misses/evictions')
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        self._expire(time.monotonic())
+        return key in self._data
+
+    def __getitem__(self, key):
+        self._expire(time.monotonic())
+        if (item := self._data.get(key)) is None:
+            self._event('miss')
+            raise KeyError(key)
+        self._data.move_to_end(key)
+        self._event('hit')
+        return item[0]
+
+    def __setitem__(self, key, value) -> None:
+        self._expire(now := time.monotonic())
+        self.pop(key, None)
+        if self.timeout is not None and self.timeout <= 0:
+            return
+        size = self.sizeof(value)
+        if self.max_size is not None and size > self.max_size:
+            # too big to be cached at all
+            return
+        self._data[key] = (value, size, now)
+        if self.timeout is not None:
+            self._expirations.append((now, key))
+        self._size += size
+        self._evict()
+
+    def __delitem__(self, key) -> None:
+        self._size -= self._data.pop(key)[1]
+
+    @property
+    def size(self) -> int:
+        """
+            total size of values in bytes
+        """
+        return self._size
+
+    def _event(self, event: str) -> None:
+        if self.stats_key is not None:
+            stats.add_nowait(self.stats_key, event)
+
+    def _expire(self, now: float) -> None:
+        if self.timeout is None:
+            return
+        while self._expirations and self._expirations[0][0] + self.timeout <= now:
+            inserted, key = self._expirations.popleft()
+            # value may be already replaced or evicted
+            if (item := self._data.get(key)) is not None and item[2] == inserted:
+                del self[key]
+                self._event('expiration')
+
+    def _evict(self) -> None:
+        while self._data and (
+            (self.max_size is not None and self._size > self.max_size)
+            or (self.max_count is not None and len(self._data) > self.max_count)
+        ):
+            self._size -= self._data.popitem(last=False)[1][1]
+            self._event('eviction')
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *default):
+        if (item := self._data.pop(key, None)) is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self._size -= item[1]
+        return item[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._expirations.clear()
+        self._size = 0
+
+    def update_limits(self, **kwargs) -> None:
+        """
+            change timeout/max_size/max_count; evict values over new limits
+            new timeout applies to values already in cache too
+        """
+        timeout = self.timeout
+        for key in ('timeout', 'max_size', 'max_count'):
+            if key in kwargs:
+                setattr(self, key, kwargs[key])
+        if self.timeout is None:
+            self._expirations.clear()
+        elif timeout is None:
+            self._expirations = deque(sorted((item[2], key) for key, item in self._data.items()))
+        self._expire(time.monotonic())
+        self._evict()
+
+    def options(self) -> Dict[str, Any]:
+        return {
+            'count': len(self._data),
+            'size': self._size,
+            'timeout': self.timeout,
+            'max_size': self.max_size,
+            'max_count': self.max_count,
+        }
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+import k2.stats.stats as stats
+
+FILE_IO_DEFAULTS = {
+    'max_workers': 4,
+    'stats_key': 'file_io_queue',
+}
+
+
+def _read(filename: str, offset: int, count: int) -> bytes:
+    with open(filename, 'rb') as f:
+        if offset:
+            f.seek(offset)
+        return f.read(count)
+
+
+def _scandir(path: str) -> List[Tuple[str, bool, bool, bool]]:
+    """
+        return list of (name, is_dir, is_link, is_file)
+    """
+    with os.scandir(path) as it:
+        return [
+            (entry.name, entry.is_dir(), entry.is_symlink(), entry.is_file())
+            for entry in it
+        ]
+
+
+class FileIO:
+    """
+        runs blocking file operations in bounded thread pool
+        so slow disk does not stall event loop
+        kwargs:
+            max_workers - size of thread pool (default: 4)
+            stats_key - key of k2.stats counter with count of queued and running operations
+    """
+
+    def __init__(self, **kwargs):
+        self.max_workers = kwargs.get('max_workers', FILE_IO_DEFAULTS['max_workers'])
+        self.stats_key = kwargs.get('stats_key', FILE_IO_DEFAULTS['stats_key'])
+        self._executor = None
+        self._queued = 0
+        stats.new(key=self.stats_key, type='counter', description='queued and running file operations')
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    async def run(self, func: Callable, *args) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='k2-file-io')
+        self._queued += 1
+        await stats.add(self.stats_key, 1)
+        try:
+            return await asyncio.get_event_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._queued -= 1
+            await stats.add(self.stats_key, -1)
+
+    async def stat(self, path: str) -> Optional[os.stat_result]:
+        """
+            return os.stat_result or None if path does not exist
+        """
+        try:
+            return await self.run(os.stat, path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    async def read(self, filename: str, offset: int = 0, count: int = -1) -> bytes:
+        return await self.run(_read, filename, offset, count)
+
+    async def open(self, filename: str, mode: str = 'rb'):
+        return await self.run(open, filename, mode)
+
+    async def scandir(self, path: str) -> List[Tuple[str, bool, bool, bool]]:
+        return await self.run(_scandir, path)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# shared pool for static files
+DefaultFileIO = FileIO()
+
+
+def configure(**kwargs) -> FileIO:
+    """
+        replace shared pool with new one
+        kwargs - same as for FileIO
+    """
+    global DefaultFileIO
+    DefaultFileIO.shutdown()
+    DefaultFileIO = FileIO(**kwargs)
+    return DefaultFileIO
+
+
+def get_file_io() -> FileIO:
+    return DefaultFileIO
@@ -1,7 +1,11 @@
 #!/usr/bin/etc python3
 
 import asyncio
-from typing import Dict, Callable
+from functools import lru_cache
+from string import Formatter
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Callable, FrozenSet, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote
 
 PRIVETE_IP = set(
     {'10.', '192.168.', '0.0.0.0', '127.0.0.'}.union(
@@ -124,6 +128,15 @@ SMTH_HAPPENED = '''
 </body></html>
 '''
 
+SERVICE_UNAVAILABLE = '''
+<html><head>
+<title>503 Service Unavailable</title>
+</head><body>
+<h1>Service Unavailable</h1>
+<p>This kek-server is too busy now. Try again later.</p>
+</body></html>
+'''
+
 CONTENT_HTML = {'Content-type': 'text/html; charset=utf-8'}
 CONTENT_JS = {'Content-type': 'application/javascript; charset=utf-8'}
 CONTENT_JSON = {'Content-type': 'text/json; charset=utf-8'}
@@ -196,12 +209,23 @@ MAX_HEADER_COUNT = 64
 MAX_HEADER_LEN = 2 ** 16
 MAX_URI_LENGTH = 256
 MAX_STATUS_LENGTH = 256
+MAX_RANGE_COUNT = 16
+
+HEAD_SEPARATOR = b'\r\n\r\n'
 
 
 LOG_STRING = '{method} {code} {url} {args}, t={time:.4f}'
 LOG_ARGS = {}  # type: Dict[str, Callable]
 
 
+@lru_cache(maxsize=16)
+def format_fields(fmt: str) -> FrozenSet[str]:
+    """
+        names of fields used in format string: '{a} {b:.2f}' => {'a', 'b'}
+    """
+    return frozenset(name.split('.', 1)[0].split('[', 1)[0] for _, name, _, _ in Formatter().parse(fmt) if name)
+
+
 async def readln(reader, max_len=None, ignore_zeros=False, exception=None) -> bytes:
     st = []
     a = True
@@ -218,6 +242,171 @@ async def readln(reader, max_len=None, ignore_zeros=False, exception=None) -> by
     return bytes(st)
 
 
+async def _read_until(reader, separator: bytes) -> Tuple[bytes, bool]:
+    """
+        read up to separator (including it) or EOF
+        return chunk and False if it was cut because of reader's buffer limit
+    """
+    try:
+        return await reader.readuntil(separator), True
+    except asyncio.LimitOverrunError as e:
+        # head is bigger than reader's buffer: drain it and go on
+        return await reader.readexactly(e.consumed), False
+    except asyncio.IncompleteReadError as e:
+        return e.partial, True
+
+
+async def _read_lines(reader, buff: List[bytes], max_len=None, exception=None) -> bytes:
+    """
+        read lines of head into buff up to empty line or EOF
+        each line may end with CRLF or bare LF, so empty line is LF or CRLF right after LF
+        leading empty lines are skipped
+    """
+    size = sum(map(len, buff))
+    # next chunk starts new line
+    new_line = not buff
+    while True:
+        chunk, done = await _read_until(reader, b'\n')
+        if not buff and not (chunk := chunk.lstrip()):
+            if done and reader.at_eof():
+                return b''
+            continue
+        if new_line and (chunk == b'\n' or chunk == b'\r\n'):
+            break
+        buff.append(chunk)
+        if max_len is not None and (size := size + len(chunk)) > max_len + len(HEAD_SEPARATOR):
+            raise ValueError('head is too long') if exception is None else exception
+        if done and not chunk.endswith(b'\n'):
+            # EOF
+            break
+        new_line = done
+    head = b''.join(buff) if len(buff) > 1 else buff[0]
+    return head.rstrip(b'\r\n')
+
+
+async def read_head(reader, max_len=None, exception=None, idle_timeout=None, timeout=None) -> Optional[bytes]:
+    """
+        read HTTP head (start line and headers) from asyncio.StreamReader
+        using bulk reads of whole lines up to empty line or EOF
+        idle_timeout - max seconds to wait for first byte; None for no limit
+        timeout - max seconds to read whole head; raise asyncio.TimeoutError if expired
+        return head without trailing empty line or None if nothing was got in idle_timeout
+    """
+    buff = []
+    if idle_timeout is not None:
+        try:
+            if not (first := await asyncio.wait_for(reader.read(1), idle_timeout)):
+                return b''
+        except asyncio.TimeoutError:
+            return None
+        if not first.isspace():
+            buff.append(first)
+    lines = _read_lines(reader, buff, max_len=max_len, exception=exception)
+    return await (lines if timeout is None else asyncio.wait_for(lines, timeout))
+
+
+def split_lines(head: bytes) -> List[memoryview]:
+    """
+        split HTTP head into lines without copying
+        lines may be separated by CRLF or LF
+    """
+    lines = []
+    view = memoryview(head)
+    i = 0
+    while (j := head.find(b'\n', i)) >= 0:
+        lines.append(view[i:j - 1] if j > i and head[j - 1] == 13 else view[i:j])
+        i = j + 1
+    if i < len(head):
+        lines.append(view[i:])
+    return lines
+
+
+class Headers(dict):
+    """
+        case-insensitive dict of HTTP headers
+        keys are lower-cased once on insert; lookups lower-case only given key
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *a, **b):
+        super().__init__()
+        self.update(*a, **b)
+
+    @classmethod
+    def from_raw(cls, raw: Iterable[Tuple[bytes, bytes]]) -> 'Headers':
+        """
+            build from pairs (lower-cased key, value) as they are in request head
+            values are url-decoded; repeated headers are joined with ', '
+        """
+        headers = cls()
+        for key, value in raw:
+            key, value = str(key, 'utf-8', 'replace'), decode_header_value(value)
+            dict.__setitem__(headers, key, ', '.join([headers[key], value]) if key in headers else value)
+        return headers
+
+    @staticmethod
+    def get_raw(raw: Iterable[Tuple[bytes, bytes]], key: str, default=None) -> Optional[str]:
+        """
+            get one header from pairs as they are in request head without decoding others
+        """
+        key = key.lower().encode()
+        if not (values := [decode_header_value(value) for _key, value in raw if _key == key]):
+            return default
+        return ', '.join(values)
+
+    def __getitem__(self, key):
+        return super().__getitem__(key.lower())
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key.lower(), value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key.lower())
+
+    def __contains__(self, key):
+        return super().__contains__(key.lower())
+
+    def get(self, key, default=None):
+        return super().get(key.lower(), default)
+
+    def pop(self, key, *default):
+        return super().pop(key.lower(), *default)
+
+    def setdefault(self, key, default=None):
+        return super().setdefault(key.lower(), default)
+
+    def update(self, *a, **b):
+        for key, value in dict(*a, **b).items():
+            self[key] = value
+
+    def copy(self) -> 'Headers':
+        return Headers(self)
+
+
+def decode_header_value(value: bytes) -> str:
+    return unquote(str(value, 'utf-8', 'replace').strip())
+
+
+def parse_args(query: str) -> Dict[str, str]:
+    """
+        parse query string; first value is taken for repeated keys
+    """
+    return {k: v[0] for k, v in parse_qs(query).items() if v} if query else {}
+
+
+def parse_cookies(header: str) -> Dict[str, str]:
+    """
+        parse Cookie header: "a=1; b=2" => {'a': '1', 'b': '2'}
+    """
+    cookies = {}
+    for pair in header.split(';'):
+        key, sep, value = pair.partition('=')
+        if sep and (key := key.strip()):
+            cookies[key] = unquote(value.strip().strip('"'))
+    return cookies
+
+
 def mime_type(st: str) -> str:
     st = st.split('.')[-1]
     for type_, _map in CONTENT_TYPE_MAP.items():
@@ -234,6 +423,122 @@ def content_type(st: str) -> Dict[str, str]:
     return {'Content-type': f'{mime_type(st)}'}
 
 
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+        parse Accept-Encoding header
+        return dict: encoding => q-value
+    """
+    res = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        if not (coding := coding.strip().lower()):
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        res[coding] = q
+    return res
+
+
+def choose_encoding(header: str, available: Iterable[str]) -> Optional[str]:
+    """
+        header - Accept-Encoding header
+        available - encodings server can use in order of preference
+        return most acceptable of available encodings, 'identity' or None if nothing is acceptable
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in available:
+        if (q := accepted.get(encoding, accepted.get('*', 0.0))) > best_q:
+            best, best_q = encoding, q
+    if best is not None and accepted.get('identity', 0.0) <= best_q:
+        return best
+    # identity is acceptable unless explicitly refused
+    return 'identity' if accepted.get('identity', accepted.get('*', 1.0)) > 0 else None
+
+
+def http_date(timestamp: float) -> str:
+    """
+        format unix timestamp as HTTP-date
+    """
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_http_date(value: str) -> Optional[float]:
+    """
+        parse HTTP-date
+        return unix timestamp or None if value is malformed
+    """
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """
+        header - If-None-Match header
+        weak comparison of header entity-tags with etag
+    """
+    if header.strip() == '*':
+        return True
+    etag = etag[2:] if etag.startswith('W/') else etag
+    return any(
+        (tag[2:] if tag.startswith('W/') else tag) == etag
+        for tag in (tag.strip() for tag in header.split(','))
+    )
+
+
+def not_modified(headers, etag: Optional[str] = None, last_modified: Optional[float] = None) -> bool:
+    """
+        headers - request headers
+        etag - ETag of resource
+        last_modified - unix timestamp of resource modification
+        return True if client's copy is still valid and 304 can be sent
+    """
+    if 'if-none-match' in headers:
+        return etag is not None and etag_matches(headers['if-none-match'], etag)
+    if last_modified is not None and 'if-modified-since' in headers:
+        return (since := parse_http_date(headers['if-modified-since'])) is not None and int(last_modified) <= since
+    return False
+
+
+def parse_range(header: str, size: int, max_count: int = MAX_RANGE_COUNT) -> Optional[List[Tuple[int, int]]]:
+    """
+        header - Range header
+        size - size of resource in bytes
+        return list of satisfiable ranges as (offset, count),
+            empty list if none of ranges is satisfiable (416)
+            or None if header must be ignored (malformed, not bytes or too many ranges)
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec.strip():
+        return None
+    ranges = []
+    for item in spec.split(','):
+        if not (item := item.strip()):
+            continue
+        first, sep, last = (x.strip() for x in item.partition('-'))
+        if not sep or not (first or last) or any(x and not x.isdigit() for x in (first, last)):
+            return None
+        if not first:
+            # suffix range: last N bytes
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start, end = int(first), (int(last) if last else size - 1)
+            if end < start and last:
+                return None
+            end = min(end, size - 1)
+        if start <= end:
+            ranges.append((start, end - start + 1))
+    return ranges if len(ranges) <= max_count else None
+
+
 def is_local_ip(addr) -> bool:
     return any(
         (
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 import asyncio
-from typing import Optional
+from typing import Callable, Optional
 
 
 def encode_to_utf8(data: str) -> Optional[bytes]:
@@ -17,3 +17,35 @@ async def call_corofunc(handler, *a, **b):
         return await handler(*a, **b)
     else:
         return handler(*a, **b)
+
+
+LIST_MUTATORS = (
+    '__setitem__', '__delitem__', '__iadd__', '__imul__',
+    'append', 'extend', 'insert', 'remove', 'pop', 'clear', 'sort', 'reverse',
+)
+SET_MUTATORS = (
+    'add', 'discard', 'remove', 'pop', 'clear',
+    'update', 'difference_update', 'intersection_update', 'symmetric_difference_update',
+    '__ior__', '__iand__', '__isub__', '__ixor__',
+)
+
+
+def _notifying(method: Callable) -> Callable:
+    def wrapper(self, *a, **b):
+        result = method(self, *a, **b)
+        self._changed()
+        return result
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+def notify_changes(*methods: str) -> Callable[[type], type]:
+    """
+        class decorator for subclass of list/set/dict:
+        self._changed() is called after each call of methods (e.g. LIST_MUTATORS)
+    """
+    def decorator(cls: type) -> type:
+        for name in methods:
+            setattr(cls, name, _notifying(getattr(cls, name)))
+        return cls
+    return decorator
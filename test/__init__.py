@@ -2,6 +2,7 @@
 import unittest
 
 from .aeon import *
+from .logger import *
 from .stats import *
 from .utils import *
 
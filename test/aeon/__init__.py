@@ -1,5 +1,7 @@
 
 from .sm import TestSM
+from .namespace import TestNameSpace
+from .response import TestResponse
 from .parser import (
     TestServerParser,
     TestClientParser,
@@ -8,14 +10,34 @@ from .restsm import TestRestSM
 from .authsm import TestAuthSM
 from .authrestsm import TestAuthRestSM
 from .script_runner import TestScriptRunner
+from .static import TestStaticResponse
+from .file import TestFileResponse
+from .shutdown import TestShutdown
+from .timeouts import TestTimeouts
+from .limits import TestLimits
+from .request import TestRequest
+from .pipeline import TestPipeline
+from .ware import TestWare
+from .supervisor import TestSupervisor
 
 
 __all__ = [
     'TestSM',
     'TestAuthSM',
     'TestRestSM',
+    'TestNameSpace',
+    'TestResponse',
     'TestAuthRestSM',
     'TestServerParser',
     'TestClientParser',
     'TestScriptRunner',
+    'TestStaticResponse',
+    'TestFileResponse',
+    'TestShutdown',
+    'TestTimeouts',
+    'TestLimits',
+    'TestRequest',
+    'TestPipeline',
+    'TestWare',
+    'TestSupervisor',
 ]
@@ -0,0 +1,81 @@
+import os
+import asyncio
+import tempfile
+import unittest
+
+from k2.aeon.responses import FileResponse
+
+LOOP = asyncio.get_event_loop()
+
+SIZE = 1 << 20
+
+
+class TestFileResponse(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.dir.name, 'data.bin')
+        # bigger than socket buffers so sendfile has to wait for client
+        self.data = os.urandom(SIZE)
+        with open(self.filename, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def send(self, resp):
+        """
+            write response into real tcp socket and read everything from other side
+        """
+        async def handle(reader, writer):
+            await resp.write(writer)
+            await writer.drain()
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            try:
+                reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                data = await asyncio.wait_for(reader.read(), 10)
+                writer.close()
+                return data
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        head, _, body = LOOP.run_until_complete(run()).partition(b'\r\n\r\n')
+        return head.lower(), body
+
+    def test_whole_file(self):
+        head, body = self.send(FileResponse(self.filename))
+        self.assertTrue(head.startswith(b'http/1.1 200 ok'))
+        self.assertIn(f'content-length: {SIZE}'.encode(), head)
+        self.assertEqual(body, self.data)
+
+    def test_single_range(self):
+        resp = FileResponse()
+        resp.set_ranges(self.filename, [(1000, SIZE // 2)], SIZE)
+        head, body = self.send(resp)
+        self.assertTrue(head.startswith(b'http/1.1 206 partial content'))
+        self.assertIn(f'content-range: bytes 1000-{1000 + SIZE // 2 - 1}/{SIZE}'.encode(), head)
+        self.assertIn(f'content-length: {SIZE // 2}'.encode(), head)
+        self.assertEqual(body, self.data[1000:1000 + SIZE // 2])
+
+    def test_multipart_byteranges(self):
+        ranges = [(0, 10), (SIZE // 4, SIZE // 2), (SIZE - 5, 5)]
+        resp = FileResponse()
+        resp.set_ranges(self.filename, ranges, SIZE)
+        head, body = self.send(resp)
+        self.assertTrue(head.startswith(b'http/1.1 206 partial content'))
+        boundary = resp.headers['content-type'].split('boundary=')[1].encode()
+        self.assertIn(f'content-length: {len(body)}'.encode(), head)
+        self.assertTrue(body.endswith(b'\r\n--' + boundary + b'--\r\n'))
+        parts = body[:-len(boundary) - 8].split(b'--' + boundary + b'\r\n')
+        self.assertEqual(parts[0], b'')
+        self.assertEqual(len(parts), len(ranges) + 1)
+        for part, (offset, count) in zip(parts[1:], ranges):
+            part_head, _, data = part.partition(b'\r\n\r\n')
+            self.assertIn(f'Content-Range: bytes {offset}-{offset + count - 1}/{SIZE}'.encode(), part_head)
+            self.assertEqual(data[:count], self.data[offset:offset + count])
+            self.assertIn(data[count:], {b'\r\n', b''})
+        # same body as for non-socket export
+        self.assertEqual(body, LOOP.run_until_complete(resp.export_parts())[1])
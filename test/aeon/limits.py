@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+from k2.aeon import SiteModule, Response
+
+from .server import AeonServer, LOOP
+
+
+class SlowSiteModule(SiteModule):
+    async def get(self, request):
+        await asyncio.sleep(0.2)
+        return Response(data='ok')
+
+
+class TestLimits(AeonServer, unittest.TestCase):
+    def start(self, **kwargs):
+        super().start({r'^/': SlowSiteModule()}, **kwargs)
+
+    async def _get(self, delay=0):
+        return await self.talk(b'GET / HTTP/1.1\r\nConnection: close\r\n\r\n', delay=delay), LOOP.time()
+
+    def test_max_connections(self):
+        self.start(max_connections=1)
+        (first, t1), (second, t2) = LOOP.run_until_complete(asyncio.gather(self._get(), self._get(0.05)))
+        self.assertTrue(first.startswith(b'HTTP/1.1 200 OK'))
+        self.assertTrue(second.startswith(b'HTTP/1.1 200 OK'))
+        # second connection waited in backlog until first one was closed
+        self.assertGreaterEqual(t2 - t1, 0.15)
+        self.assertFalse(self.aeon._accept_paused)
+
+    def test_max_connections_same_batch(self):
+        self.start(max_connections=1)
+        (first, _), (second, _) = LOOP.run_until_complete(asyncio.gather(self._get(), self._get()))
+        # both are accepted at once: second one is over limit
+        self.assertEqual(
+            sorted([first[:12], second[:12]]),
+            [b'HTTP/1.1 200', b'HTTP/1.1 503'],
+        )
+        (third, _), = LOOP.run_until_complete(asyncio.gather(self._get()))
+        self.assertTrue(third.startswith(b'HTTP/1.1 200 OK'))
+        self.assertEqual(len(self.aeon._servers), 1)
+
+    def test_shed(self):
+        self.start(max_in_flight=1, max_queued=0)
+        (first, _), (second, _) = LOOP.run_until_complete(asyncio.gather(self._get(), self._get(0.05)))
+        self.assertTrue(first.startswith(b'HTTP/1.1 200 OK'))
+        self.assertTrue(second.startswith(b'HTTP/1.1 503'))
+
+    def test_queue(self):
+        self.start(max_in_flight=1, queue_timeout=1.0)
+        (first, t1), (second, t2) = LOOP.run_until_complete(asyncio.gather(self._get(), self._get(0.05)))
+        self.assertTrue(first.startswith(b'HTTP/1.1 200 OK'))
+        self.assertTrue(second.startswith(b'HTTP/1.1 200 OK'))
+        self.assertGreaterEqual(t2 - t1, 0.15)
+
+    def test_queue_timeout(self):
+        self.start(max_in_flight=1, queue_timeout=0.05)
+        (first, _), (second, _) = LOOP.run_until_complete(asyncio.gather(self._get(), self._get(0.05)))
+        self.assertTrue(first.startswith(b'HTTP/1.1 200 OK'))
+        self.assertTrue(second.startswith(b'HTTP/1.1 503'))
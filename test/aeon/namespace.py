@@ -0,0 +1,48 @@
+import unittest
+
+from k2.aeon import Response
+from k2.aeon.namespace import NameSpace
+
+
+class TestNameSpace(unittest.TestCase):
+    def setUp(self):
+        self.root = Response(code=200, data='root')
+        self.any = Response(code=200, data='any')
+        self.item = Response(code=200, data='item')
+        self.api = Response(code=200, data='api')
+        self.static = Response(code=200, data='static')
+        self.ns = NameSpace(
+            {
+                r'^/$': self.root,
+                r'^/+': self.any,
+                r'^/api/': {
+                    r'(?P<id>\d+)$': self.item,
+                    r'': self.api,
+                },
+                r'^/static/(?P<path>.*)': self.static,
+            },
+            cache_size=2,
+        )
+
+    def test_exact(self):
+        self.assertEqual(self.ns.find_best('/'), (self.root, {}))
+
+    def test_longest_match(self):
+        self.assertEqual(self.ns.find_best('//'), (self.any, {}))
+        self.assertEqual(self.ns.find_best('/static/a/b.js'), (self.static, {'path': 'a/b.js'}))
+
+    def test_subtree(self):
+        self.assertEqual(self.ns.find_best('/api/12'), (self.item, {'id': '12'}))
+        self.assertEqual(self.ns.find_best('/api/12x'), (self.api, {}))
+
+    def test_not_found(self):
+        self.assertEqual(self.ns.find_best('api'), (None, None))
+
+    def test_cache(self):
+        for _ in range(2):
+            for url in ['/api/1', '/api/2', '/api/3']:
+                self.assertEqual(self.ns.find_best(url), (self.item, {'id': url[-1]}))
+        self.ns.find_best('/api/3')[1]['id'] = 'changed'
+        self.assertEqual(self.ns.find_best('/api/3'), (self.item, {'id': '3'}))
+        self.ns[r'^/api/3'] = self.root
+        self.assertEqual(self.ns.find_best('/api/3'), (self.root, {}))
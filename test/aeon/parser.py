@@ -2,6 +2,7 @@ import asyncio
 import unittest
 
 from k2.aeon.exceptions import AeonResponse
+from k2.aeon.requests import BodyReader
 from k2.aeon.parser import (
     parse_data,
     parse_response_data,
@@ -10,24 +11,11 @@ from k2.aeon.parser import (
 LOOP = asyncio.get_event_loop()
 
 
-class Reader:
-    def __init__(self, data):
-        self._data = data if isinstance(data, bytes) else data.encode()
-
-    def __iter__(self):
-        return self
-
-    def __next__(self):
-        return self._data.pop(0)
-
-    def at_eof(self):
-        return not self._data
-
-    async def read(self, i=None):
-        i = i or len(self._data)
-        data = self._data[:i]
-        self._data = self._data[i:]
-        return data
+class Reader(asyncio.StreamReader):
+    def __init__(self, data, limit=2 ** 16):
+        super().__init__(limit=limit, loop=LOOP)
+        self.feed_data(data if isinstance(data, bytes) else data.encode())
+        self.feed_eof()
 
 
 class TestClientParser(unittest.TestCase):
@@ -88,6 +76,94 @@ class TestClientParser(unittest.TestCase):
         self.assertEqual(result.data, rb'ABCDEFGHIJK')
         self.assertEqual(result.http_version, 'HTTP/1.1')
 
+    def test_ok_stream(self):
+        async def read_stream(data):
+            res = await parse_response_data(Reader(data), stream=True, chunk_size=4)
+            return res, [chunk async for chunk in res.stream]
+
+        result, chunks = LOOP.run_until_complete(
+            read_stream(
+                '\r\n'.join(
+                    [
+                        r'HTTP/1.1 200 OK',
+                        r'Content-Length: 11',
+                        r'',
+                        r'ABCDEFGHIJK',
+                    ]
+                )
+            )
+        )
+        self.assertEqual(result.code, 200)
+        self.assertEqual(result.data, b'')
+        self.assertEqual(chunks, [b'ABCD', b'EFGH', b'IJK'])
+
+    def test_ok_chunked(self):
+        result = self.do_test(
+            data='\r\n'.join(
+                [
+                    r'HTTP/1.1 200 OK',
+                    r'Transfer-Encoding: chunked',
+                    r'',
+                    r'4;ext=1',
+                    r'ABCD',
+                    r'7',
+                    r'EFGHIJK',
+                    r'0',
+                    r'x-trailer: 1',
+                    r'',
+                    r'',
+                ]
+            )
+        )
+        self.assertEqual(result.code, 200)
+        self.assertEqual(result.data, b'ABCDEFGHIJK')
+
+    def test_not_chunked(self):
+        result = self.do_test(
+            data='\r\n'.join(
+                [
+                    r'HTTP/1.1 200 OK',
+                    r'Transfer-Encoding: xchunked',
+                    r'Content-Length: 3',
+                    r'',
+                    r'ABC',
+                ]
+            )
+        )
+        self.assertEqual(result.data, b'ABC')
+
+    def test_fail_chunked(self):
+        result = self.do_test(
+            data='\r\n'.join(
+                [
+                    r'HTTP/1.1 200 OK',
+                    r'Transfer-Encoding: chunked',
+                    r'',
+                    r'4',
+                    r'ABCDEF',
+                    r'0',
+                    r'',
+                    r'',
+                ]
+            ),
+            error=True,
+        )
+        self.assertEqual(result, None)
+
+    def test_fail_content_length(self):
+        result = self.do_test(
+            data='\r\n'.join(
+                [
+                    r'HTTP/1.1 200 OK',
+                    r'Content-Length: -5',
+                    r'',
+                    r'ABCDE',
+                ]
+            ),
+            error=True,
+        )
+        self.assertEqual(result, None)
+
     def test_fail_1(self):
         result = self.do_test(
             data='\r\n'.join(
@@ -361,3 +437,164 @@ class TestServerParser(unittest.TestCase):
             ]
         )
         self.do_test(traffic, {}, code=418, allowed_http_version=set())
+
+    def test_protocol_leading_empty_lines(self):
+        traffic = '\r\n'.join(
+            [
+                r'',
+                r'',
+                r'GET /abc/?a=1 HTTP/1.1',
+                r'Host: 127.0.0.1',
+                r'',
+                r'',
+            ]
+        )
+        data = self.do_test(traffic, {}, error=False)
+        self.assertEqual(data.url, '/abc/')
+        self.assertEqual(data.args, {'a': '1'})
+        self.assertEqual(data.headers, {'host': '127.0.0.1'})
+
+    def test_protocol_head_over_reader_limit(self):
+        traffic = '\r\n'.join(
+            [
+                r'GET /abc/ HTTP/1.1',
+                *[f'x-header-{i}: {i}' for i in range(32)],
+                r'',
+                r'',
+            ]
+        )
+        data = LOOP.run_until_complete(parse_data(Reader(traffic, limit=16)))
+        self.assertEqual(len(data.headers), 32)
+        self.assertEqual(data.headers['x-header-31'], '31')
+
+    def test_protocol_line_endings(self):
+        async def parse(traffic):
+            # no EOF: head must be found by its empty line
+            reader = asyncio.StreamReader(loop=LOOP)
+            reader.feed_data(traffic)
+            return await asyncio.wait_for(parse_data(reader), 1)
+
+        for traffic in (
+            b'GET /a?b=1 HTTP/1.1\nHost: x\nX-Y: z\n\n',
+            b'GET /a?b=1 HTTP/1.1\r\nHost: x\r\nX-Y: z\r\n\r\n',
+            b'\r\nGET /a?b=1 HTTP/1.1\r\nH: x\r\nX-Y: z\r\n\r\n',
+            # mixed line endings
+            b'GET /a?b=1 HTTP/1.1\r\nHost: x\nX-Y: z\n\n',
+            b'GET /a?b=1 HTTP/1.1\nHost: x\r\nX-Y: z\r\n\r\n',
+            b'GET /a?b=1 HTTP/1.1\r\nHost: x\r\nX-Y: z\n\r\n',
+        ):
+            data = LOOP.run_until_complete(parse(traffic))
+            self.assertEqual(data.url, '/a')
+            self.assertEqual(data.args, {'b': '1'})
+            self.assertEqual(data.headers['x-y'], 'z')
+        for traffic in (b'GET / HTTP/1.1\n\n', b'GET / HTTP/1.1\r\n\r\n', b'GET / HTTP/1.1\r\n\n'):
+            data = LOOP.run_until_complete(parse(traffic))
+            self.assertEqual(data.url, '/')
+            self.assertEqual(data.headers, {})
+
+    def test_protocol_next_request_left_in_buffer(self):
+        traffic = '\r\n'.join(
+            [
+                r'POST / HTTP/1.1',
+                r'Content-Length: 3',
+                r'',
+                r'abcGET / HTTP/1.1',
+                r'',
+                r'',
+            ]
+        )
+        reader = Reader(traffic)
+        self.assertEqual(LOOP.run_until_complete(parse_data(reader)).data, b'abc')
+        self.assertEqual(LOOP.run_until_complete(parse_data(reader)).method, 'GET')
+
+    def test_protocol_chunked(self):
+        traffic = '\r\n'.join(
+            [
+                r'POST / HTTP/1.1',
+                r'Transfer-Encoding: chunked',
+                r'',
+                r'3',
+                r'ABC',
+                r'5',
+                r'DEFGH',
+                r'0',
+                r'',
+                r'',
+            ]
+        )
+        data = self.do_test(traffic, {}, error=False)
+        self.assertEqual(data.data, b'ABCDEFGH')
+
+    def test_protocol_chunked_fail(self):
+        traffic = '\r\n'.join(
+            [
+                r'POST / HTTP/1.1',
+                r'Transfer-Encoding: chunked',
+                r'',
+                r'5',
+                r'ABCDE',
+                r'5',
+                r'DEFGH',
+                r'0',
+                r'',
+                r'',
+            ]
+        )
+        self.do_test(traffic, {}, code=413, max_data_length=8)
+
+    def test_protocol_chunk_size_strict(self):
+        def traffic(size, encoding='chunked'):
+            return '\r\n'.join(
+                [
+                    r'POST / HTTP/1.1',
+                    f'Transfer-Encoding: {encoding}',
+                    r'',
+                    size,
+                    r'ABCD',
+                    r'0',
+                    r'',
+                    r'',
+                ]
+            )
+
+        for size in ('0x4', '+4', '0_4', ' 4', '4 ', '-4'):
+            self.do_test(traffic(size), {}, code=400)
+        for size in ('4', '4;ext=1', '4 ;ext=1'):
+            self.assertEqual(self.do_test(traffic(size), {}, error=False).data, b'ABCD')
+        self.assertEqual(self.do_test(traffic('4', 'gzip, Chunked'), {}, error=False).data, b'ABCD')
+        for encoding in ('xchunked', 'chunked, gzip', 'chunkedx'):
+            self.do_test(traffic('4', encoding), {}, code=400)
+
+    def test_protocol_invalid_content_length(self):
+        for value in ('-5', 'abc', '+5'):
+            traffic = '\r\n'.join(
+                [
+                    r'POST / HTTP/1.1',
+                    f'Content-Length: {value}',
+                    r'',
+                    r'ABCDE',
+                ]
+            )
+            self.do_test(traffic, {}, code=400)
+
+    def test_protocol_stream(self):
+        traffic = '\r\n'.join(
+            [
+                r'POST / HTTP/1.1',
+                r'Content-Length: 10',
+                r'',
+                r'ABCDEFGHIJ',
+            ]
+        )
+
+        async def read_body():
+            body = BodyReader((await parse_data(Reader(traffic), stream=True, chunk_size=4)).stream)
+            buff = bytearray(3)
+            parts = []
+            while i := await body.readinto(buff):
+                parts.append(bytes(buff[:i]))
+            return parts, body.done
+
+        parts, done = LOOP.run_until_complete(read_body())
+        self.assertEqual(parts, [b'ABC', b'D', b'EFG', b'H', b'IJ'])
+        self.assertTrue(done)
@@ -0,0 +1,79 @@
+import socket
+import struct
+import asyncio
+import unittest
+
+from k2.aeon import SiteModule, Response
+
+from .server import AeonServer, LOOP
+
+
+class SleepSiteModule(SiteModule):
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    async def get(self, request, delay):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(float(delay))
+        finally:
+            self.running -= 1
+        return Response(data=delay)
+
+
+class TestPipeline(AeonServer, unittest.TestCase):
+    def start(self, **kwargs):
+        self.module = SleepSiteModule()
+        super().start({r'^/(?P<delay>[\d.]+)$': self.module}, **kwargs)
+
+    async def _talk(self, *delays):
+        start = LOOP.time()
+        data = await self.talk(
+            b''.join(
+                f'GET /{delay} HTTP/1.1\r\n{"Connection: close" if i == len(delays) - 1 else "X-A: 1"}\r\n\r\n'.encode()
+                for i, delay in enumerate(delays)
+            )
+        )
+        return data, LOOP.time() - start
+
+    def test_in_order(self):
+        self.start(pipeline_depth=4)
+        data, spent = LOOP.run_until_complete(self._talk('0.2', '0', '0.2', '0.1'))
+        self.assertEqual(data.count(b'HTTP/1.1 200 OK'), 4)
+        self.assertEqual(
+            [part.rsplit(b'\r\n\r\n', 1)[1] for part in data.split(b'HTTP/1.1 ')[1:]],
+            [b'0.2', b'0', b'0.2', b'0.1'],
+        )
+        # handled concurrently
+        self.assertLess(spent, 0.45)
+
+    def test_depth(self):
+        self.start(pipeline_depth=2)
+        data, spent = LOOP.run_until_complete(self._talk('0.1', '0.1', '0.1', '0.1'))
+        self.assertEqual(data.count(b'HTTP/1.1 200 OK'), 4)
+        self.assertGreaterEqual(spent, 0.2)
+        self.assertLess(spent, 0.35)
+        self.assertEqual(self.module.max_running, 2)
+
+    def test_max_requests(self):
+        self.start(pipeline_depth=4, max_keep_alive_requests=2)
+        data, _ = LOOP.run_until_complete(self._talk('0', '0', '0'))
+        self.assertEqual(data.count(b'HTTP/1.1 200 OK'), 2)
+        self.assertEqual(data.count(b'connection: close'), 1)
+
+    def test_reset(self):
+        self.start(pipeline_depth=4)
+
+        async def talk():
+            reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+            writer.write(b'GET /0 HTTP/1.1\r\n\r\nGET /0 HTTP/1.1\r\nHost')
+            await reader.readuntil(b'\r\n\r\n')
+            # RST instead of FIN
+            writer.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            writer.transport.abort()
+            await asyncio.sleep(0.1)
+
+        LOOP.run_until_complete(talk())
+        self.assertEqual(len(self.aeon._connections), 0)
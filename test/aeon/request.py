@@ -0,0 +1,76 @@
+import asyncio
+import unittest
+
+import k2.logger as logger
+from k2.aeon.parser import parse_data
+from k2.aeon.requests import Request
+from k2.aeon.responses import Response
+from k2.utils import http
+
+LOOP = asyncio.get_event_loop()
+
+
+class TestRequest(unittest.TestCase):
+    def test_shared_cfg(self):
+        cfg = Request.make_cfg(believe_x_from_y=True)
+        a = Request(addr=('127.0.0.1', 1), reader=None, writer=None, cfg=cfg)
+        b = Request(addr=('127.0.0.1', 2), reader=None, writer=None, cfg=cfg)
+        self.assertIs(a.cfg, b.cfg)
+        self.assertTrue(a.cfg.believe_x_from_y)
+        self.assertFalse(Request(addr=('127.0.0.1', 3), reader=None, writer=None).cfg.believe_x_from_y)
+
+    def test_attributes(self):
+        req = Request(addr=('127.0.0.1', 1), reader=None, writer=None)
+        req.user = 'admin'
+        req.ctx.session = 'abc'
+        self.assertEqual((req.user, req.ctx.session), ('admin', 'abc'))
+
+    def test_lazy_logger(self):
+        channels = len(logger.logger.Channels)
+        req = Request(addr=('127.0.0.1', 5555), reader=None, writer=None)
+        self.assertIsNone(req._logger)
+        self.assertIs(req.logger, req.logger)
+        self.assertEqual(channels, len(logger.logger.Channels))
+
+        parent = logger.new_channel('test-request', parent=None, autosave=False)
+        req._logger = logger.ChannelContext('127.0.0.1:5555', parent)
+        LOOP.run_until_complete(req.logger.info('hello {}', 'world'))
+        self.assertIn('[127.0.0.1:5555] hello world', parent.export()[-1]['log_msg'])
+        logger.delete_channel(parent)
+
+    def test_lazy_head(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'GET /a?x=1&y=2 HTTP/1.1\r\nX-From-Y: 1.2.3.4\r\nCookie: sid=abc; lang=en\r\n\r\n')
+        head = LOOP.run_until_complete(parse_data(reader))
+        self.assertIsNone(head._args)
+        self.assertIsNone(head._headers)
+
+        req = Request(addr=('127.0.0.1', 1), reader=None, writer=None, believe_x_from_y=True)
+        req.init_from_dict(head)
+        self.assertEqual(req.target, '/a?x=1&y=2')
+        self.assertIsNone(head._headers)
+        self.assertEqual(req.args, {'x': '1', 'y': '2'})
+        self.assertEqual(req.headers['x-from-y'], '1.2.3.4')
+        self.assertEqual(req.cookies, {'sid': 'abc', 'lang': 'en'})
+        self.assertEqual(req.ip, '1.2.3.4')
+
+    def test_lazy_access_log(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'GET /a?x=1 HTTP/1.1\r\nX-Request-ID: abc\r\nX-From-Y: 1.2.3.4\r\n\r\n')
+        req = Request(addr=('127.0.0.1', 1), reader=None, writer=None, believe_x_from_y=True)
+        req.init_from_dict(LOOP.run_until_complete(parse_data(reader)))
+        parent = logger.new_channel('test-request-access', parent=None, autosave=False)
+        req._logger = logger.ChannelContext('127.0.0.1:1', parent)
+
+        log_string, http.LOG_STRING = http.LOG_STRING, '{method} {code} {url} {ip}'
+        try:
+            LOOP.run_until_complete(req._log_access(Response(code=200)))
+        finally:
+            http.LOG_STRING = log_string
+        self.assertIn('(abc) GET 200 /a 1.2.3.4', parent.export()[-1]['log_msg'])
+        self.assertIsNone(req._args)
+        self.assertIsNone(req._headers)
+
+        LOOP.run_until_complete(req._log_access(Response(code=200)))
+        self.assertIn("(abc) GET 200 /a {'x': '1'}", parent.export()[-1]['log_msg'])
+        logger.delete_channel(parent)
@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+from k2.aeon import Response, StreamResponse
+
+LOOP = asyncio.get_event_loop()
+
+
+class Writer:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+
+    def writelines(self, data):
+        self.parts.extend(data)
+
+    async def drain(self):
+        pass
+
+
+class TestResponse(unittest.TestCase):
+    def test_export(self):
+        self.assertEqual(
+            LOOP.run_until_complete(Response(data='abc', headers={'Content-Type': 'text/plain'}).export()),
+            b'\r\n'.join(
+                [
+                    b'HTTP/1.1 200 OK',
+                    b'Content-Type: text/plain',
+                    b'server: kek-server',
+                    b'accept-ranges: bytes',
+                    b'content-length: 3',
+                    b'',
+                    b'abc',
+                ]
+            ),
+        )
+
+    def test_content_length(self):
+        for code, length in [(200, None), (204, None), (304, None), (101, None), (404, b'0'), (500, b'0')]:
+            head = LOOP.run_until_complete(Response(data='', code=code).export()).lower()
+            self.assertEqual(
+                head.split(b'content-length: ')[1].split(b'\r\n')[0] if b'content-length' in head else None,
+                length,
+            )
+
+    def test_write_big_body(self):
+        data = b'a' * (2 ** 20)
+        LOOP.run_until_complete((resp := Response(data=data)).write(writer := Writer()))
+        self.assertEqual(len(writer.parts), 2)
+        self.assertIs(writer.parts[1], data)
+        self.assertEqual(writer.parts[0], LOOP.run_until_complete(resp.export())[:-len(data)])
+
+    def test_stream(self):
+        async def gen():
+            yield 'abc'
+            yield b''
+            yield b'defgh'
+
+        LOOP.run_until_complete(StreamResponse(gen(), headers={'Content-Length': 8}).write(writer := Writer()))
+        self.assertEqual(
+            b''.join(writer.parts),
+            b'\r\n'.join(
+                [
+                    b'HTTP/1.1 200 OK',
+                    b'server: kek-server',
+                    b'content-type: text/html; charset=utf-8',
+                    b'accept-ranges: bytes',
+                    b'transfer-encoding: chunked',
+                    b'',
+                    b'3',
+                    b'abc',
+                    b'5',
+                    b'defgh',
+                    b'0',
+                    b'',
+                    b'',
+                ]
+            ),
+        )
@@ -0,0 +1,38 @@
+import asyncio
+
+from k2.aeon import Aeon
+
+LOOP = asyncio.get_event_loop()
+
+
+class AeonServer:
+    """
+        mixin for test cases talking to Aeon through real socket
+        server listens on random port of 127.0.0.1 and is shut down after each test
+    """
+
+    aeon = None
+
+    def start(self, namespace, **kwargs) -> None:
+        self.aeon = Aeon(namespace=namespace, **kwargs)
+        self.server = LOOP.run_until_complete(asyncio.start_server(self.aeon._handle_connection, '127.0.0.1', 0))
+        self.aeon._servers = [self.server]
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def tearDown(self):
+        if self.aeon is not None:
+            LOOP.run_until_complete(self.aeon.shutdown(timeout=0))
+
+    async def talk(self, *parts, pause=0, delay=0, timeout=2) -> bytes:
+        """
+            open connection after delay, send parts with pause after each one
+            and read everything until server closes connection
+        """
+        await asyncio.sleep(delay)
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        for part in parts:
+            writer.write(part)
+            await asyncio.sleep(pause)
+        data = await asyncio.wait_for(reader.read(), timeout)
+        writer.close()
+        return data
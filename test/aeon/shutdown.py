@@ -0,0 +1,44 @@
+import asyncio
+import unittest
+
+from k2.aeon import SiteModule, Response
+
+from .server import AeonServer, LOOP
+
+
+class SlowSiteModule(SiteModule):
+    async def get(self, request):
+        await asyncio.sleep(float(request.args['t']))
+        return Response(data='done')
+
+
+class TestShutdown(AeonServer, unittest.TestCase):
+    def setUp(self):
+        self.start({r'^/slow': SlowSiteModule()})
+
+    async def _shutdown(self, t, timeout):
+        idle_reader, idle_writer = await asyncio.open_connection('127.0.0.1', self.port)
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(f'GET /slow?t={t} HTTP/1.1\r\n\r\n'.encode())
+        await asyncio.sleep(0.1)
+        shutdown = asyncio.ensure_future(self.aeon.shutdown(timeout=timeout))
+        idle = await asyncio.wait_for(idle_reader.read(), 1)
+        data = await asyncio.wait_for(reader.read(), 2)
+        await shutdown
+        idle_writer.close()
+        writer.close()
+        return idle, data
+
+    def test_drain(self):
+        idle, data = LOOP.run_until_complete(self._shutdown(0.2, 2))
+        self.assertEqual(idle, b'')
+        self.assertTrue(data.startswith(b'HTTP/1.1 200 OK'))
+        self.assertIn(b'connection: close', data)
+        self.assertTrue(data.endswith(b'done'))
+        self.assertFalse(self.server.is_serving())
+
+    def test_timeout(self):
+        idle, data = LOOP.run_until_complete(self._shutdown(5, 0.2))
+        self.assertEqual(idle, b'')
+        self.assertEqual(data, b'')
+        self.assertFalse(self.aeon._connections)
@@ -0,0 +1,150 @@
+import os
+import gzip
+import asyncio
+import tempfile
+import unittest
+
+from k2.aeon import StaticResponse
+from k2.utils.autocfg import AutoCFG
+from k2.utils.cache import LRUCache
+from k2.utils.http import http_date
+
+LOOP = asyncio.get_event_loop()
+
+
+class Logger:
+    async def debug(self, *a, **b):
+        pass
+
+    async def error(self, *a, **b):
+        pass
+
+    async def exception(self, *a, **b):
+        pass
+
+
+class TestStaticResponse(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = LRUCache(timeout=60)
+        for name, data in [
+            ('a.css', b'body {}' * 10),
+            ('b.css', b'b {}'),
+            ('b.css.gz', gzip.compress(b'b {}')),
+            ('c.bin', bytes(range(100))),
+        ]:
+            with open(os.path.join(self.dir.name, name), 'wb') as f:
+                f.write(data)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def load(self, name, headers=None, **kwargs):
+        resp = StaticResponse(
+            AutoCFG(
+                url='/' + name,
+                args={},
+                method='GET',
+                headers=AutoCFG(key_modifier=lambda x: x.lower()).update(headers or {}),
+                logger=Logger(),
+            ),
+            cache=self.cache,
+            **kwargs
+        )
+        LOOP.run_until_complete(resp.load_static_file(os.path.join(self.dir.name, name)))
+        return resp, LOOP.run_until_complete(resp.export_parts())
+
+    def test_compress_variants(self):
+        resp, (_, data) = self.load('a.css', {'Accept-Encoding': 'gzip'})
+        self.assertEqual(resp.headers['content-encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(data), b'body {}' * 10)
+        self.assertEqual(len(self.cache), 2)
+        resp, (_, data) = self.load('a.css', {'Accept-Encoding': 'identity'})
+        self.assertNotIn('content-encoding', resp.headers)
+        self.assertEqual(data, b'body {}' * 10)
+
+    def test_precompressed(self):
+        resp, (_, data) = self.load('b.css', {'Accept-Encoding': 'gzip'})
+        self.assertEqual(resp.headers['content-encoding'], 'gzip')
+        self.assertTrue(resp.headers['content-type'].startswith('text/css'))
+        self.assertEqual(gzip.decompress(data), b'b {}')
+        resp, (_, data) = self.load('b.css', {'Accept-Encoding': 'gzip'}, precompressed=None)
+        self.assertEqual(gzip.decompress(data), b'b {}')
+        resp, (_, data) = self.load('b.css')
+        self.assertEqual(data, b'b {}')
+
+    def test_etag(self):
+        for kwargs in [{}, {'etag': 'hash'}, {'server_cache': False}]:
+            resp, _ = self.load('a.css', {'Accept-Encoding': 'gzip'}, **kwargs)
+            self.assertEqual(resp.code, 200)
+            self.assertTrue((etag := resp.headers['etag']).endswith('-gzip"'))
+            resp, (head, data) = self.load('a.css', {'Accept-Encoding': 'gzip', 'If-None-Match': etag}, **kwargs)
+            self.assertEqual(resp.code, 304)
+            self.assertEqual(data, b'')
+            # 304 must not override content-length of cached 200
+            self.assertNotIn(b'content-length', head.lower())
+            self.assertEqual(resp.headers['etag'], etag)
+            resp, _ = self.load('a.css', {'Accept-Encoding': 'identity', 'If-None-Match': etag}, **kwargs)
+            self.assertEqual(resp.code, 200)
+            self.cache.clear()
+
+    def test_last_modified(self):
+        mtime = os.stat(os.path.join(self.dir.name, 'a.css')).st_mtime
+        resp, _ = self.load('a.css', {'If-Modified-Since': http_date(mtime + 1)})
+        self.assertEqual(resp.code, 304)
+        resp, _ = self.load('a.css', {'If-Modified-Since': http_date(mtime - 10)})
+        self.assertEqual(resp.code, 200)
+        resp, _ = self.load('a.css', {'If-Modified-Since': http_date(mtime + 1), 'If-None-Match': '"x"'})
+        self.assertEqual(resp.code, 200)
+
+    def test_range(self):
+        resp, (head, data) = self.load('c.bin', {'Range': 'bytes=10-19'})
+        self.assertEqual(resp.code, 206)
+        self.assertEqual(data, bytes(range(10, 20)))
+        self.assertIn(b'content-range: bytes 10-19/100', head)
+        resp, (_, data) = self.load('c.bin', {'Range': 'bytes=-5'})
+        self.assertEqual(data, bytes(range(95, 100)))
+        resp, (_, data) = self.load('c.bin', {'Range': 'bytes=98-'})
+        self.assertEqual(data, bytes(range(98, 100)))
+
+    def test_multi_range(self):
+        resp, (head, data) = self.load('c.bin', {'Range': 'bytes=0-1,-2'})
+        self.assertEqual(resp.code, 206)
+        boundary = resp.headers['content-type'].split('boundary=')[1]
+        self.assertIn(f'content-length: {len(data)}'.encode(), head)
+        self.assertEqual(
+            data,
+            b'\r\n'.join(
+                [
+                    f'--{boundary}'.encode(),
+                    b'Content-Type: application/octet-stream',
+                    b'Content-Range: bytes 0-1/100',
+                    b'',
+                    bytes([0, 1]),
+                    f'--{boundary}'.encode(),
+                    b'Content-Type: application/octet-stream',
+                    b'Content-Range: bytes 98-99/100',
+                    b'',
+                    bytes([98, 99]),
+                    f'--{boundary}--'.encode(),
+                    b'',
+                ]
+            ),
+        )
+
+    def test_range_not_satisfiable(self):
+        resp, (head, data) = self.load('c.bin', {'Range': 'bytes=100-'})
+        self.assertEqual(resp.code, 416)
+        self.assertIn(b'content-range: bytes */100', head)
+        self.assertEqual(data, b'')
+        resp, (_, data) = self.load('c.bin', {'Range': 'bytes=5-2'})
+        self.assertEqual(resp.code, 200)
+        self.assertEqual(data, bytes(range(100)))
+
+    def test_if_range(self):
+        etag = self.load('c.bin')[0].headers['etag']
+        resp, (_, data) = self.load('c.bin', {'Range': 'bytes=0-1', 'If-Range': etag})
+        self.assertEqual(resp.code, 206)
+        resp, (_, data) = self.load('c.bin', {'Range': 'bytes=0-1', 'If-Range': '"old"'})
+        self.assertEqual(resp.code, 200)
+        self.assertEqual(len(data), 100)
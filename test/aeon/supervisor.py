@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import signal
+import socket
+import tempfile
+import unittest
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# each worker leaves file named by its pid in argv[1]
+SERVER = '''
+import os
+import sys
+
+from k2.aeon import Aeon, SiteModule, Response
+
+
+class PidSiteModule(SiteModule):
+    async def get(self, request):
+        return Response(data=str(os.getpid()))
+
+
+class PidAeon(Aeon):
+    def run_worker(self, sockets, tasks=()):
+        open(os.path.join(sys.argv[1], str(os.getpid())), 'w').close()
+        super().run_worker(sockets, tasks)
+
+
+PidAeon(
+    namespace={r'^/': PidSiteModule()},
+    host='127.0.0.1',
+    port=int(sys.argv[2]),
+    workers=2,
+    logger={'autosave': False},
+    supervisor={'restart_delay': 0.1, 'stop_timeout': 5.0, 'poll_interval': 0.05},
+).run()
+'''
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+class TestSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.proc = subprocess.Popen(
+            [sys.executable, '-c', SERVER, self.dir.name, str(self.port)],
+            cwd=self.dir.name,
+            env=dict(os.environ, PYTHONPATH=ROOT),
+        )
+
+    def tearDown(self):
+        workers = self.workers()
+        self.proc.send_signal(signal.SIGTERM)
+        self.assertEqual(self.proc.wait(10), 0)
+        self.assertFalse(any(alive(pid) for pid in workers))
+        self.dir.cleanup()
+
+    def workers(self):
+        return {pid for pid in map(int, os.listdir(self.dir.name)) if alive(pid)}
+
+    def wait_workers(self, check, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not check(workers := self.workers()):
+            self.assertLess(time.monotonic(), deadline, f'workers: {workers}')
+            time.sleep(0.05)
+        return workers
+
+    def get(self):
+        deadline = time.monotonic() + 10.0
+        while True:
+            try:
+                with socket.create_connection(('127.0.0.1', self.port), timeout=5) as sock:
+                    sock.sendall(b'GET / HTTP/1.1\r\nConnection: close\r\n\r\n')
+                    data = b''
+                    while chunk := sock.recv(4096):
+                        data += chunk
+                    return data
+            except ConnectionRefusedError:
+                # not listening yet
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.05)
+
+    def test_spawn(self):
+        workers = self.wait_workers(lambda workers: len(workers) == 2)
+        data = self.get()
+        self.assertTrue(data.startswith(b'HTTP/1.1 200 OK'))
+        self.assertIn(int(data.rsplit(b'\r\n\r\n', 1)[1]), workers)
+
+    def test_restart(self):
+        workers = self.wait_workers(lambda workers: len(workers) == 2)
+        os.kill(crashed := workers.pop(), signal.SIGKILL)
+        new = self.wait_workers(lambda new: len(new) == 2 and crashed not in new)
+        self.assertIn(workers.pop(), new)
+        self.assertTrue(self.get().startswith(b'HTTP/1.1 200 OK'))
+
+    def test_reload(self):
+        workers = self.wait_workers(lambda workers: len(workers) == 2)
+        self.proc.send_signal(signal.SIGHUP)
+        # all workers are replaced
+        self.wait_workers(lambda new: len(new) == 2 and not new & workers)
+        self.assertTrue(self.get().startswith(b'HTTP/1.1 200 OK'))
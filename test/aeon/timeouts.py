@@ -0,0 +1,43 @@
+import unittest
+
+from k2.aeon import SiteModule, Response
+
+from .server import AeonServer, LOOP
+
+
+class EchoSiteModule(SiteModule):
+    async def post(self, request):
+        return Response(data=request.data)
+
+    async def get(self, request):
+        return Response(data='ok')
+
+
+class TestTimeouts(AeonServer, unittest.TestCase):
+    def setUp(self):
+        self.start(
+            {r'^/': EchoSiteModule()},
+            keep_alive_timeout=0.2,
+            max_keep_alive_requests=2,
+            request={'protocol': {'head_timeout': 0.2, 'body_timeout': 0.2}},
+        )
+
+    def test_idle(self):
+        data = LOOP.run_until_complete(self.talk(b'GET / HTTP/1.1\r\n\r\n'))
+        self.assertTrue(data.startswith(b'HTTP/1.1 200 OK'))
+        self.assertEqual(data.count(b'HTTP/1.1'), 1)
+
+    def test_head_timeout(self):
+        data = LOOP.run_until_complete(self.talk(b'GET / HTTP/1.1\r\n', b'X-A: 1\r\n', pause=0.3))
+        self.assertTrue(data.startswith(b'HTTP/1.1 408'))
+
+    def test_body_timeout(self):
+        data = LOOP.run_until_complete(
+            self.talk(b'POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\n12345', b'67890', pause=0.3)
+        )
+        self.assertTrue(data.startswith(b'HTTP/1.1 408'))
+
+    def test_max_requests(self):
+        data = LOOP.run_until_complete(self.talk(b'GET / HTTP/1.1\r\n\r\n' * 3, pause=0.05))
+        self.assertEqual(data.count(b'HTTP/1.1 200 OK'), 2)
+        self.assertEqual(data.count(b'connection: close'), 1)
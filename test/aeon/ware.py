@@ -0,0 +1,97 @@
+import asyncio
+import unittest
+
+import k2.stats.stats as stats
+from k2.aeon import Aeon, SiteModule, Response
+
+LOOP = asyncio.get_event_loop()
+
+
+def sync_ware(request, **_):
+    request.ctx.calls.append('sync')
+
+
+async def async_ware(request, **_):
+    request.ctx.calls.append('async')
+
+
+async def route_ware(request, **_):
+    request.ctx.calls.append('route')
+
+
+def postware(request, response, **_):
+    response.data = ','.join(request.ctx.calls)
+
+
+class CallsSiteModule(SiteModule):
+    async def get(self, request):
+        return Response(data='-')
+
+
+class SkipSiteModule(CallsSiteModule):
+    middleware = [route_ware]
+    skip_ware = ['sync_ware']
+
+
+async def init_calls(request, **_):
+    request.ctx.calls = []
+
+
+class TestWare(unittest.TestCase):
+    def setUp(self):
+        self.aeon = Aeon(namespace={r'^/all$': CallsSiteModule(), r'^/skip$': SkipSiteModule()})
+        for ware in [init_calls, sync_ware, async_ware]:
+            self.aeon.add_middleware(ware)
+        self.aeon.add_postware(postware)
+
+    def get(self, url):
+        return LOOP.run_until_complete(self.aeon.emulate_request(url, _run_ware=True)).data
+
+    def test_chain(self):
+        self.assertEqual(self.get('/all'), b'sync,async')
+        self.assertEqual(self.get('/skip'), b'async,route')
+
+    def test_not_shared(self):
+        self.assertEqual(Aeon().middleware, [])
+        self.assertEqual(Aeon.middleware, [])
+
+    def test_stats(self):
+        # stats are kept between servers: count calls of this test only
+        counts = [stats.export_one(key)['data']['count'] for key in ('ware-sync_ware', 'ware-postware')]
+        self.get('/all')
+        self.assertEqual(
+            [stats.export_one(key)['data']['count'] for key in ('ware-sync_ware', 'ware-postware')],
+            [count + 1 for count in counts],
+        )
+
+    def test_add_after_compile(self):
+        self.get('/all')
+
+        async def late(request, **_):
+            request.ctx.calls.append('late')
+
+        self.aeon.add_middleware(late)
+        self.assertEqual(self.get('/all'), b'sync,async,late')
+
+    def test_change_lists(self):
+        self.get('/all')
+        self.aeon.middleware.append(route_ware)
+        self.assertEqual(self.get('/all'), b'sync,async,route')
+        self.aeon.middleware.remove(sync_ware)
+        self.assertEqual(self.get('/all'), b'async,route')
+        self.aeon.middleware = [init_calls, sync_ware]
+        self.assertEqual(self.get('/all'), b'sync')
+        self.aeon.middleware += [async_ware]
+        self.assertEqual(self.get('/all'), b'sync,async')
+
+    def test_same_name_stats(self):
+        first, second = (lambda request, **_: None), (lambda request, **_: None)
+        self.aeon.add_middleware(first)
+        self.aeon.add_middleware(second)
+        self.get('/all')
+        key = 'ware-TestWare.test_same_name_stats.<locals>.<lambda>'
+        self.assertEqual(stats.export_one(key)['data']['count'], 1)
+        self.assertEqual(stats.export_one(f'{key}-{id(second):x}')['data']['count'], 1)
+        # compiling same ware again doesn't reset its stat
+        Aeon().add_middleware(first)
+        self.assertEqual(stats.export_one(key)['data']['count'], 1)
@@ -0,0 +1,7 @@
+from .writer import TestLogWriter
+from .channel import TestChannel
+
+__all__ = [
+    'TestLogWriter',
+    'TestChannel',
+]
@@ -0,0 +1,157 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+
+from k2.logger.channel import Channel, ChannelContext
+from k2.logger.writer import get_writer
+
+LOOP = asyncio.get_event_loop()
+
+
+class Spy:
+    def __init__(self):
+        self.formatted = 0
+
+    def __format__(self, spec):
+        self.formatted += 1
+        return 'spy'
+
+    def __str__(self):
+        return 'spy'
+
+
+class TestChannel(unittest.TestCase):
+    def setUp(self):
+        self.channel = Channel(key='test', autosave=False, stdout=False, log_levels={'info', 'error'})
+
+    def test_is_enabled(self):
+        self.assertTrue(self.channel.is_enabled('info'))
+        self.assertFalse(self.channel.is_enabled('debug'))
+        self.assertFalse(ChannelContext('ctx', self.channel).is_enabled('debug'))
+
+    def test_lazy_format(self):
+        spy = Spy()
+        LOOP.run_until_complete(self.channel.debug('{}', spy))
+        self.assertEqual(spy.formatted, 0)
+        self.assertEqual(self.channel.export(), [])
+        LOOP.run_until_complete(self.channel.info('{}', spy))
+        self.assertEqual(spy.formatted, 1)
+        self.assertTrue(self.channel.export()[-1]['log_msg'].endswith('[test] spy'))
+
+    def test_exception(self):
+        self.channel.update(log_levels={'info'})
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            LOOP.run_until_complete(self.channel.exception('failed'))
+        self.assertEqual(self.channel.export(), [])
+
+    def test_propagation(self):
+        levels = {'info', 'error'}
+        root = Channel(key='root', autosave=False, log_levels=set(levels))
+        left = Channel(key='left', autosave=False, log_levels=set(levels))
+        right = Channel(key='right', autosave=False, log_levels={'error'})
+        child = Channel(key='child', autosave=False, log_levels=set(levels))
+        left.add_parent(root)
+        right.add_parent(root)
+        child.add_parent(left)
+        child.add_parent(right)
+        right.update(log_levels={'error'})
+        LOOP.run_until_complete(child.info('hi'))
+        # root gets record once (through left); right does not accept info
+        self.assertEqual([len(ch.export()) for ch in (child, left, right, root)], [1, 1, 0, 1])
+        self.assertIs(root.export()[0], child.export()[0])
+        self.assertIn('[child] hi', root.export()[0]['log_msg'])
+
+        other = Channel(key='other', autosave=False, log_levels=set(levels))
+        root.add_parent(other)
+        LOOP.run_until_complete(child.info('again'))
+        self.assertEqual(len(other.export()), 1)
+
+    def test_direct_levels_change(self):
+        root = Channel(key='root', autosave=False, log_levels={'error'})
+        child = Channel(key='child', autosave=False, log_levels={'info', 'error'})
+        child.add_parent(root, inherite_rights=set())
+        LOOP.run_until_complete(child.info('a'))
+        self.assertEqual(len(root.export()), 0)
+        # sinks cached for info are resolved again
+        root.cfg.log_levels.add('info')
+        LOOP.run_until_complete(child.info('b'))
+        self.assertEqual(len(root.export()), 1)
+        root.cfg.log_levels = {'error'}
+        LOOP.run_until_complete(child.info('c'))
+        self.assertEqual(len(root.export()), 1)
+        root.cfg['log_levels'] = {'info'}
+        LOOP.run_until_complete(child.info('d'))
+        self.assertEqual(len(root.export()), 2)
+        # levels are not shared between channels
+        child.cfg.update(log_levels=root.cfg.log_levels)
+        child.cfg.log_levels.add('debug')
+        self.assertNotIn('debug', root.cfg.log_levels)
+        Channel(key='other', autosave=False).cfg.log_levels.add('trace')
+        self.assertNotIn('trace', Channel(key='another', autosave=False).cfg.log_levels)
+
+    def test_sinks_cache_scope(self):
+        root = Channel(key='root', autosave=False, log_levels={'info'})
+        child = Channel(key='child', autosave=False, log_levels={'info'})
+        child.add_parent(root)
+        LOOP.run_until_complete(child.info('a'))
+        self.assertIn('info', child._sinks_cache)
+        # new channel (e.g. one per client session) and change of sibling don't touch cached sinks
+        sibling = Channel(key='sibling', autosave=False, log_levels={'info'})
+        sibling.add_parent(root)
+        sibling.cfg.log_levels.add('debug')
+        self.assertIn('info', child._sinks_cache)
+        root.cfg.log_levels.add('debug')
+        self.assertNotIn('info', child._sinks_cache)
+
+    def test_limit(self):
+        self.channel.update(limit=3)
+        for i in range(5):
+            LOOP.run_until_complete(self.channel.info('{}', i))
+        self.assertEqual([record['log_msg'][-1] for record in self.channel.export()], ['2', '3', '4'])
+
+    def test_timeout(self):
+        LOOP.run_until_complete(self.channel.info('old'))
+        self.channel.export()[0]['timestamp'] -= 7200
+        self.channel._t = 0
+        LOOP.run_until_complete(self.channel.info('new'))
+        self.assertEqual([record['log_msg'][-3:] for record in self.channel.export()], ['new'])
+
+    def test_export_filters(self):
+        self.channel.update(timeout=None)
+        LOOP.run_until_complete(self.channel.info('a'))
+        LOOP.run_until_complete(self.channel.error('b'))
+        records = self.channel.export()
+        for i, record in enumerate(records):
+            record['timestamp'] = 100.0 + i
+        self.assertEqual([r['level'] for r in self.channel.export(level='error')], ['error'])
+        self.assertEqual([r['log_msg'][-1] for r in self.channel.export(since=101.0)], ['b'])
+        self.assertEqual([r['log_msg'][-1] for r in self.channel.export(until=100.5)], ['a'])
+        self.assertEqual(len(self.channel.export(level={'info', 'error'})), 2)
+
+    def test_json(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.channel.update(json_file=(filename := os.path.join(path, 'log.jsonl')))
+            ctx = ChannelContext('127.0.0.1:1', self.channel)
+            LOOP.run_until_complete(ctx.info('{method} {code}', method='GET', code=200, args={'a': '1'}, obj=Spy()))
+            LOOP.run_until_complete(ctx.debug('skipped'))
+            get_writer(filename).close()
+            with open(filename) as f:
+                lines = f.readlines()
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(
+            {k: v for k, v in record.items() if k != 'timestamp'},
+            {
+                'level': 'info',
+                'key': '127.0.0.1:1',
+                'msg': 'GET 200',
+                'method': 'GET',
+                'code': 200,
+                'args': {'a': '1'},
+                'obj': 'spy',
+            },
+        )
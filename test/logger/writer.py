@@ -0,0 +1,51 @@
+import os
+import time
+import tempfile
+import unittest
+
+from k2.logger.writer import LogWriter
+
+
+class TestLogWriter(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.dir.name, 'log.txt')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def read(self):
+        with open(self.filename) as f:
+            return f.read()
+
+    def test_batch(self):
+        writer = LogWriter(self.filename, flush_interval=0.05)
+        for i in range(3):
+            self.assertTrue(writer.write(f'{i}\n'))
+        self.assertFalse(os.path.exists(self.filename))
+        time.sleep(0.2)
+        self.assertEqual(self.read(), '0\n1\n2\n')
+        self.assertEqual(writer.queued, 0)
+        writer.close()
+
+    def test_flush_size(self):
+        writer = LogWriter(self.filename, flush_interval=10, flush_size=8)
+        writer.write('1234\n')
+        writer.write('5678\n')
+        time.sleep(0.1)
+        self.assertEqual(self.read(), '1234\n5678\n')
+        writer.close()
+
+    def test_close(self):
+        writer = LogWriter(self.filename, flush_interval=10)
+        writer.write('line\n')
+        writer.close()
+        self.assertEqual(self.read(), 'line\n')
+
+    def test_dropped(self):
+        writer = LogWriter(self.filename, flush_interval=10, max_queue=2)
+        self.assertEqual([writer.write('x\n') for _ in range(3)], [True, True, False])
+        self.assertEqual((writer.queued, writer.dropped), (2, 1))
+        writer.flush()
+        self.assertEqual(self.read(), 'x\nx\n')
+        writer.close()
@@ -1,4 +1,6 @@
+import json
 import asyncio
+import tempfile
 import unittest
 
 from k2.stats import stats
@@ -81,3 +83,56 @@ class TestStats(unittest.TestCase):
             'type': stats.STATS_TYPE_EVENTCOUNTER,
             'description': None,
         })
+
+    def test_merge(self):
+        merged = stats.merge(
+            {
+                'w1': {
+                    'c': {'data': {'data': 2, 'default': 0}, 'type': stats.STATS_TYPE_COUNTER, 'description': None},
+                    'e': {'data': {'data': {'a': 1}}, 'type': stats.STATS_TYPE_EVENTCOUNTER, 'description': None},
+                    'avg': {
+                        'data': {'data': 10, 'count': 1, 'limit': 500},
+                        'type': stats.STATS_TYPE_AVERAGE,
+                        'description': None,
+                    },
+                },
+                'w2': {
+                    'c': {'data': {'data': 3, 'default': 0}, 'type': stats.STATS_TYPE_COUNTER, 'description': None},
+                    'e': {'data': {'data': {'a': 1, 'b': 2}}, 'type': stats.STATS_TYPE_EVENTCOUNTER, 'description': None},
+                    'avg': {
+                        'data': {'data': 1, 'count': 2, 'limit': 500},
+                        'type': stats.STATS_TYPE_AVERAGE,
+                        'description': None,
+                    },
+                },
+            }
+        )
+        self.assertEqual(merged['c']['data'], {'data': 5, 'default': 0})
+        self.assertEqual(merged['c']['processes']['w2'], {'data': 3, 'default': 0})
+        self.assertEqual(merged['e']['data'], {'data': {'a': 2, 'b': 2}})
+        self.assertEqual(merged['avg']['data'], {'data': 4, 'count': 3, 'limit': 500})
+
+    def test_merge_snapshot(self):
+        key = 'test-merge-time-events'
+        stats.new(key, stats.STATS_TYPE_TIMEEVENTCOUNTER)
+        for _ in range(3):
+            LOOP.run_until_complete(stats.add(key))
+        live = stats.export()
+        merged = stats.merge({'this': live, 'other': json.loads(json.dumps(live))})[key]['data']
+        self.assertEqual(sum(merged['data'].values()), 6)
+        self.assertEqual(merged['count'], len(merged['data']))
+        self.assertTrue(all(isinstance(ts, str) for ts in merged['data']))
+
+    def test_export_all(self):
+        key = 'test-shared-counter'
+        stats.new(key, stats.STATS_TYPE_COUNTER)
+        LOOP.run_until_complete(stats.add(key, 2))
+        with tempfile.TemporaryDirectory() as path:
+            stats.share(path, name='other')
+            stats.save_snapshot()
+            stats.share(path, name='this')
+            try:
+                self.assertEqual(LOOP.run_until_complete(stats.export_all())[key]['data']['data'], 4)
+            finally:
+                stats.share(None)
+        self.assertEqual(LOOP.run_until_complete(stats.export_all())[key]['data']['data'], 2)
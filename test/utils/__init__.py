@@ -9,6 +9,13 @@ from .art import (
     TestDictArt,
 )
 from .autocfg import TestParseEnv
+from .fileio import TestFileIO
+from .cache import TestLRUCache
+from .http import (
+    TestAcceptEncoding,
+    TestRange,
+    TestHeaders,
+)
 
 __all__ = [
     'TestJschema',
@@ -19,4 +26,9 @@ __all__ = [
     'TestListArt',
     'TestDictArt',
     'TestParseEnv',
+    'TestFileIO',
+    'TestLRUCache',
+    'TestAcceptEncoding',
+    'TestRange',
+    'TestHeaders',
 ]
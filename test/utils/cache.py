@@ -0,0 +1,67 @@
+import time
+import unittest
+
+from k2.stats import stats
+from k2.utils.cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_lru(self):
+        cache = LRUCache(max_count=2)
+        cache['a'] = b'1'
+        cache['b'] = b'2'
+        self.assertEqual(cache['a'], b'1')
+        cache['c'] = b'3'
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache['a'], b'1')
+        self.assertEqual(cache['c'], b'3')
+
+    def test_max_size(self):
+        cache = LRUCache(max_size=10)
+        cache['a'] = b'12345'
+        cache['b'] = b'12345'
+        self.assertEqual(cache.size, 10)
+        cache['c'] = b'1'
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.size, 6)
+        cache['d'] = b'12345678901'
+        self.assertNotIn('d', cache)
+        cache['b'] = b'1'
+        self.assertEqual(cache.size, 2)
+        cache.update_limits(max_size=1)
+        self.assertEqual(len(cache), 1)
+
+    def test_timeout(self):
+        cache = LRUCache(timeout=0.01)
+        cache['a'] = b'1'
+        self.assertEqual(cache['a'], b'1')
+        time.sleep(0.02)
+        cache['b'] = b'2'
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.size, 1)
+        with self.assertRaises(KeyError):
+            cache['a']
+
+    def test_update_timeout(self):
+        cache = LRUCache(timeout=10)
+        cache['a'] = b'1'
+        time.sleep(0.02)
+        cache['b'] = b'2'
+        cache.update_limits(timeout=0.01)
+        self.assertNotIn('a', cache)
+        time.sleep(0.02)
+        self.assertNotIn('b', cache)
+        cache = LRUCache()
+        cache['a'] = b'1'
+        cache.update_limits(timeout=0.01)
+        time.sleep(0.02)
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.size, 0)
+
+    def test_stats(self):
+        cache = LRUCache(max_count=1, stats_key='test-lru-cache')
+        cache['a'] = b'1'
+        cache['a']
+        cache.get('b')
+        cache['b'] = b'2'
+        self.assertEqual(stats.export_one('test-lru-cache')['data']['data'], {'hit': 1, 'miss': 1, 'eviction': 1})
@@ -0,0 +1,37 @@
+import os
+import asyncio
+import tempfile
+import unittest
+
+from k2.utils.fileio import FileIO
+
+LOOP = asyncio.get_event_loop()
+
+
+class TestFileIO(unittest.TestCase):
+    def setUp(self):
+        self.file_io = FileIO(max_workers=2, stats_key='test_file_io_queue')
+        self.dir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.dir.name, 'a.txt'), 'wb') as f:
+            f.write(b'0123456789')
+        os.mkdir(os.path.join(self.dir.name, 'b'))
+
+    def tearDown(self):
+        self.file_io.shutdown()
+        self.dir.cleanup()
+
+    def test_stat(self):
+        self.assertEqual(LOOP.run_until_complete(self.file_io.stat(os.path.join(self.dir.name, 'a.txt'))).st_size, 10)
+        self.assertIsNone(LOOP.run_until_complete(self.file_io.stat(os.path.join(self.dir.name, 'c.txt'))))
+
+    def test_read(self):
+        filename = os.path.join(self.dir.name, 'a.txt')
+        self.assertEqual(LOOP.run_until_complete(self.file_io.read(filename)), b'0123456789')
+        self.assertEqual(LOOP.run_until_complete(self.file_io.read(filename, 3, 4)), b'3456')
+        self.assertEqual(self.file_io.queued, 0)
+
+    def test_scandir(self):
+        self.assertEqual(
+            sorted(LOOP.run_until_complete(self.file_io.scandir(self.dir.name))),
+            [('a.txt', False, False, True), ('b', True, False, False)],
+        )
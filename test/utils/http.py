@@ -0,0 +1,75 @@
+import unittest
+
+from k2.utils.http import (
+    Headers,
+    parse_accept_encoding,
+    parse_cookies,
+    choose_encoding,
+    parse_range,
+)
+
+
+class TestAcceptEncoding(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(
+            parse_accept_encoding('gzip, br;q=0.5, *;q=0'),
+            {'gzip': 1.0, 'br': 0.5, '*': 0.0},
+        )
+        self.assertEqual(parse_accept_encoding(''), {})
+
+    def test_choose_by_q(self):
+        self.assertEqual(choose_encoding('gzip;q=0.5, br', ['br', 'gzip']), 'br')
+        self.assertEqual(choose_encoding('gzip, br;q=0.5', ['br', 'gzip']), 'gzip')
+
+    def test_choose_server_order(self):
+        self.assertEqual(choose_encoding('gzip, br', ['br', 'gzip']), 'br')
+        self.assertEqual(choose_encoding('*', ['gzip']), 'gzip')
+
+    def test_choose_identity(self):
+        self.assertEqual(choose_encoding('', ['gzip']), 'identity')
+        self.assertEqual(choose_encoding('gzip;q=0', ['gzip']), 'identity')
+        self.assertEqual(choose_encoding('identity, gzip;q=0.5', ['gzip']), 'identity')
+        self.assertIsNone(choose_encoding('deflate, identity;q=0', ['gzip']))
+
+
+class TestRange(unittest.TestCase):
+    def test_single(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), [(0, 10)])
+        self.assertEqual(parse_range('bytes=95-', 100), [(95, 5)])
+        self.assertEqual(parse_range('bytes=90-1000', 100), [(90, 10)])
+
+    def test_suffix(self):
+        self.assertEqual(parse_range('bytes=-5', 100), [(95, 5)])
+        self.assertEqual(parse_range('bytes=-500', 100), [(0, 100)])
+
+    def test_multi(self):
+        self.assertEqual(parse_range('bytes=0-0, -1', 100), [(0, 1), (99, 1)])
+        self.assertIsNone(parse_range(','.join(['bytes=0-1'] + ['2-3'] * 16), 100))
+
+    def test_unsatisfiable(self):
+        self.assertEqual(parse_range('bytes=100-', 100), [])
+        self.assertEqual(parse_range('bytes=-0', 100), [])
+        self.assertEqual(parse_range('bytes=0-', 0), [])
+
+    def test_malformed(self):
+        for header in ['bytes=5-2', 'items=0-1', 'bytes=a-b', 'bytes=-', 'bytes=', 'bytes=+1-2']:
+            self.assertIsNone(parse_range(header, 100), header)
+
+
+class TestHeaders(unittest.TestCase):
+    def test_case_insensitive(self):
+        headers = Headers({'Content-Type': 'text/html'})
+        headers['X-Smth'] = '1'
+        self.assertEqual(headers, {'content-type': 'text/html', 'x-smth': '1'})
+        self.assertEqual(headers['CONTENT-TYPE'], 'text/html')
+        self.assertIn('x-SMTH', headers)
+        self.assertEqual(headers.get('X-Other', '-'), '-')
+        self.assertEqual(headers.pop('X-Smth'), '1')
+
+    def test_from_raw(self):
+        headers = Headers.from_raw([(b'x-a', b' %41%20%42'), (b'accept', b' a'), (b'accept', b'b ')])
+        self.assertEqual(headers, {'x-a': 'A B', 'accept': 'a, b'})
+
+    def test_cookies(self):
+        self.assertEqual(parse_cookies('a=1; b="2"; c=%41; broken'), {'a': '1', 'b': '2', 'c': 'A'})
+        self.assertEqual(parse_cookies(''), {})